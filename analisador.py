@@ -426,7 +426,7 @@ class PDFAnalyzerApp(QMainWindow):
                 pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))  # Escala de 0.5 para reduzir tamanho
                 
                 # Converter para QImage e QPixmap
-                img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
+                img = QImage(pix.samples_mv, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
                 pixmap = QPixmap.fromImage(img)
                 
                 # Adicionar imagem ao layout de visualização
@@ -463,7 +463,7 @@ class PDFAnalyzerApp(QMainWindow):
             pix = page.get_pixmap(matrix=fitz.Matrix(1.0, 1.0))
             
             # Converter para QImage e QPixmap
-            img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
+            img = QImage(pix.samples_mv, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
             pixmap = QPixmap.fromImage(img)
             
             # Redimensionar para caber na área de visualização
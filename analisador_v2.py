@@ -1,28 +1,214 @@
 import sys
 import os
+import time
 import tempfile
 import json
-import decimal  # Adicionar importação para decimal
+import cProfile
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QFileDialog, 
                             QLabel, QVBoxLayout, QHBoxLayout, QWidget, QScrollArea,
-                            QListWidget, QListWidgetItem, QMessageBox, QInputDialog,
-                            QLineEdit, QTabWidget, QTableWidget, QTableWidgetItem,
-                            QHeaderView)
-from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt, QSize
-import PyPDF2
-import fitz  # PyMuPDF
-import numpy as np  # Para análise de cores
+                            QMessageBox, QInputDialog, QLineEdit, QTabWidget,
+                            QTableWidget, QTableWidgetItem, QTableView, QPlainTextEdit,
+                            QHeaderView, QProgressBar, QListView, QCheckBox, QComboBox)
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QSize, QObject, QThread, QTimer, pyqtSignal
 from PIL import Image  # Para processamento de imagens
+import instrumentacao
+from analise_paralela import ParallelAnalyzer
+from nucleo_analise import ColorSettings
+from sessao_documentos import DocumentSession, DEFAULT_MAX_DOCUMENTS, DEFAULT_MAX_RENDERERS
+from cache_lru import LRUCache
+from cache_resultados import ResultCache
+from modelos_qt import PageResultsModel, ThumbnailModel, render_page_image
+from resultados_colunares import PageResultStore
+from formatos_papel import PaperFormatRegistry
+from exportacao import detect_report_format, open_report
+from veredito_rapido import quick_verdict
+
+# Orçamento padrão de memória para páginas renderizadas (em MB)
+DEFAULT_PREVIEW_CACHE_MB = 256
+
+# Escalas oferecidas no zoom da visualização (além de ajustar à largura)
+PREVIEW_ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0)
+
+# Espera após o último redimensionamento da janela antes de renderizar de novo (ms)
+PREVIEW_RESIZE_DELAY_MS = 150
+
+# Páginas analisadas são enviadas à interface em lotes de até PAGE_BATCH_SIZE
+# páginas, ou a cada PAGE_BATCH_INTERVAL segundos se a análise for mais lenta
+PAGE_BATCH_SIZE = 500
+PAGE_BATCH_INTERVAL = 0.1
+
+
+def nearest_zoom_level(zoom):
+    """
+    Escala oferecida no zoom mais próxima de zoom (ex.: um valor editado no
+    arquivo de configuração), ou None (ajustar à largura) se zoom não for válido
+    """
+    if not isinstance(zoom, (int, float)) or isinstance(zoom, bool) or zoom <= 0:
+        return None
+    return min(PREVIEW_ZOOM_LEVELS, key=lambda level: abs(level - zoom))
+
+
+class AnalysisWorker(QObject):
+    """
+    Executa a análise do PDF fora da thread da interface, enviando o
+    resultado de cada página por sinais para que a janela continue responsiva
+    """
+    analysis_started = pyqtSignal(int)  # Total de páginas
+    pages_analyzed = pyqtSignal(object)  # Lista de PageResult
+    progress = pyqtSignal(int, int)  # Páginas concluídas, total
+    log_message = pyqtSignal(str, str)  # Mensagem, nível
+    failed = pyqtSignal(str, str)  # Mensagem de erro, traceback
+    profile_ready = pyqtSignal(str)  # Relatório do cProfile
+    finished = pyqtSignal(bool)  # True se a análise foi cancelada
+
+    def __init__(self, analyzer, pdf_path, timings=None):
+        super().__init__()
+        self.analyzer = analyzer
+        self.pdf_path = pdf_path
+        self.timings = timings  # StageTimings que recebe os tempos dos workers
+        self._cancelled = False
+
+    def cancel(self):
+        """Solicita a interrupção da análise (verificado entre as páginas)"""
+        self._cancelled = True
+
+    def emit_batch(self, batch, num_pages):
+        self.pages_analyzed.emit(batch)
+        self.progress.emit(batch[-1].page_index + 1, num_pages)
+
+    def run(self):
+        results = None
+        # Só as etapas desta thread (e dos workers) entram nos tempos da análise
+        with instrumentacao.activated(self.timings):
+            # O cProfile só enxerga esta thread: com ele a análise roda em um único processo
+            profiler = cProfile.Profile() if self.analyzer.profile_analysis else None
+            if profiler is not None:
+                profiler.enable()
+            try:
+                # Arquivos já analisados com a mesma versão do analisador vêm do cache
+                cache = self.analyzer.result_cache
+                digest = cached = None
+                if cache is not None:
+                    digest = cache.file_hash(self.pdf_path)
+                    cached = cache.load(digest)
+                
+                if cached is not None:
+                    num_pages = len(cached)
+                    self.log_message.emit("Resultado carregado do cache de análises", "INFO")
+                    page_results = cached
+                else:
+                    engine = ParallelAnalyzer(workers=1 if profiler else self.analyzer.analysis_workers,
+                                              cross_check=self.analyzer.cross_check_pypdf2,
+                                              session=self.analyzer.documents,
+                                              color_settings=self.analyzer.color_settings,
+                                              paper_formats=self.analyzer.paper_formats,
+                                              timings=self.timings)
+                    num_pages = engine.count_pages(self.pdf_path)
+                    results = engine.analyze(self.pdf_path, num_pages, log=self.log_message.emit,
+                                             cancelled=lambda: self._cancelled)
+                    page_results = results
+                self.analysis_started.emit(num_pages)
+                
+                analyzed = []
+                batch = []
+                last_emit = time.monotonic()
+                for page_result in page_results:
+                    if self._cancelled:
+                        break
+                    
+                    analyzed.append(page_result)
+                    batch.append(page_result)
+                    if len(batch) >= PAGE_BATCH_SIZE or time.monotonic() - last_emit >= PAGE_BATCH_INTERVAL:
+                        self.emit_batch(batch, num_pages)
+                        batch = []
+                        last_emit = time.monotonic()
+                if batch:
+                    self.emit_batch(batch, num_pages)
+                
+                # Guardar no cache apenas análises completas
+                if cache is not None and cached is None and len(analyzed) == num_pages:
+                    cache.store(digest, analyzed)
+            
+            except Exception as e:
+                import traceback
+                self.failed.emit(f"Erro ao analisar o PDF: {str(e)}", traceback.format_exc())
+            
+            finally:
+                if results is not None:
+                    results.close()
+                if profiler is not None:
+                    profiler.disable()
+                    self.save_profile(profiler)
+                self.finished.emit(self._cancelled)
+    
+    def save_profile(self, profiler):
+        """Grava o perfil em um arquivo .prof (para pstats/snakeviz) e envia o resumo"""
+        name = os.path.splitext(os.path.basename(self.pdf_path))[0]
+        path = os.path.join(tempfile.gettempdir(), f"pdf_analyzer_{name}.prof")
+        try:
+            profiler.dump_stats(path)
+            self.log_message.emit(f"Perfil da análise gravado em {path}", "INFO")
+        except OSError as e:
+            self.log_message.emit(f"Não foi possível gravar o perfil da análise: {str(e)}", "WARNING")
+        self.profile_ready.emit(instrumentacao.profile_report(profiler))
+
+class QuickVerdictWorker(QObject):
+    """
+    Executa o veredito rápido (formatos e cores misturados) fora da thread
+    da interface
+    """
+    verdict_ready = pyqtSignal(object)  # QuickVerdict
+    log_message = pyqtSignal(str, str)  # Mensagem, nível
+    failed = pyqtSignal(str, str)  # Mensagem de erro, traceback
+    finished = pyqtSignal(bool)  # True se a verificação foi cancelada
+
+    def __init__(self, analyzer, pdf_path, timings=None):
+        super().__init__()
+        self.analyzer = analyzer
+        self.pdf_path = pdf_path
+        self.timings = timings  # StageTimings da verificação (None sem medição)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        with instrumentacao.activated(self.timings):
+            try:
+                verdict = quick_verdict(self.pdf_path, self.analyzer.color_settings, self.analyzer.paper_formats,
+                                        cache=self.analyzer.result_cache, log=self.log_message.emit,
+                                        cancelled=lambda: self._cancelled, session=self.analyzer.documents)
+                self.verdict_ready.emit(verdict)
+            
+            except Exception as e:
+                import traceback
+                self.failed.emit(f"Erro na verificação rápida: {str(e)}", traceback.format_exc())
+            
+            finally:
+                self.finished.emit(self._cancelled)
 
 class PDFAnalyzerApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.config_file = os.path.join(os.path.expanduser("~"), ".pdf_analyzer_config.json")
         self.load_config()  # Carregar configuração salva
+        # Documentos abertos e display lists das páginas, compartilhados pela análise, miniaturas e preview
+        self.documents = DocumentSession(self.max_open_documents, self.display_list_cache_pages)
+        self.pixmap_cache = LRUCache(self.preview_cache_mb * 1024 * 1024)  # Páginas já renderizadas
+        self.result_cache = self.open_result_cache()  # Resultados de análises anteriores
+        self.preview_page = None  # Página exibida na visualização
+        self.preview_label = None
         self.initUI()
         self.current_pdf_path = None
         self.page_images = []
+        self.analysis_thread = None
+        self.analysis_worker = None
+        self.retired_analyses = []  # (thread, worker) cancelados que ainda não terminaram
+        self.closing = False  # Janela aguardando as análises canceladas para fechar
+        self.report_writer = None  # Relatório sendo gravado durante a análise
+        self.timings = None  # Tempos por etapa da última análise
+        self.profile_text = ""  # Relatório do cProfile da última análise
         # Configurar log
         self.setup_logging()
 
@@ -62,14 +248,45 @@ class PDFAnalyzerApp(QMainWindow):
         self.upload_btn.clicked.connect(self.upload_pdf)
         left_panel.addWidget(self.upload_btn)
         
+        # Apenas os alertas de formatos e cores, parando assim que estiverem decididos
+        self.quick_btn = QPushButton('Verificação Rápida', self)
+        self.quick_btn.clicked.connect(self.upload_pdf_quick)
+        left_panel.addWidget(self.quick_btn)
+        
         # Informações do PDF
         self.info_label = QLabel('Nenhum arquivo selecionado', self)
         self.info_label.setWordWrap(True)
         left_panel.addWidget(self.info_label)
         
+        # Progresso da análise e botão de cancelamento
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setVisible(False)
+        left_panel.addWidget(self.progress_bar)
+        
+        self.cancel_btn = QPushButton('Cancelar Análise', self)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_analysis)
+        left_panel.addWidget(self.cancel_btn)
+        
+        # Exportação dos resultados por página (continua durante a análise)
+        self.export_btn = QPushButton('Exportar Relatório', self)
+        self.export_btn.setEnabled(False)
+        self.export_btn.clicked.connect(self.export_report)
+        left_panel.addWidget(self.export_btn)
+        
+        # Resultados das páginas, compartilhados pela lista de páginas e pela tabela de cores
+        self.page_results = PageResultStore()  # Resultados de cada página, em colunas
+        self.results_model = PageResultsModel(self.page_results, self)
+        
         # Lista de páginas e formatos
-        self.page_list = QListWidget(self)
-        self.page_list.currentRowChanged.connect(self.on_page_selected)
+        self.page_list = QListView(self)
+        self.page_list.setModel(self.results_model)
+        self.page_list.setModelColumn(PageResultsModel.DESCRIPTION_COLUMN)
+        self.page_list.setUniformItemSizes(True)
+        # Posicionar os itens aos poucos, sem percorrer a lista inteira a cada lote
+        self.page_list.setLayoutMode(QListView.Batched)
+        self.page_list.selectionModel().currentRowChanged.connect(
+            lambda current, previous: self.on_page_selected(current.row()))
         left_panel.addWidget(QLabel('Páginas e Formatos:'))
         left_panel.addWidget(self.page_list)
         
@@ -107,9 +324,10 @@ class PDFAnalyzerApp(QMainWindow):
         self.color_layout = QVBoxLayout(self.color_tab)
         
         # Tabela para exibir informações de cor
-        self.color_table = QTableWidget()
-        self.color_table.setColumnCount(2)  # Página, Modo de Cor
-        self.color_table.setHorizontalHeaderLabels(['Página', 'Modo de Cor'])
+        self.color_table = QTableView()
+        self.color_table.setModel(self.results_model)  # Página, Modo de Cor, Área colorida
+        self.color_table.setColumnHidden(PageResultsModel.DESCRIPTION_COLUMN, True)
+        self.show_ink_columns(self.color_settings.ink_coverage)
         self.color_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.color_layout.addWidget(self.color_table)
         
@@ -118,18 +336,53 @@ class PDFAnalyzerApp(QMainWindow):
         # Tab para erros e avisos
         self.log_tab = QWidget()
         self.log_layout = QVBoxLayout(self.log_tab)
-        self.log_text = QLabel("Nenhum erro ou aviso registrado.")
-        self.log_text.setWordWrap(True)
+        # Registro apenas acrescentado, sem redesenhar as mensagens anteriores
+        self.log_text = QPlainTextEdit()
+        self.log_text.setReadOnly(True)
+        self.log_text.setPlaceholderText("Nenhum erro ou aviso registrado.")
         self.log_layout.addWidget(self.log_text)
         
         self.tabs.addTab(self.log_tab, "Erros e Avisos")
         
+        # Tab para os tempos por etapa e o perfil da análise
+        self.stats_tab = QWidget()
+        self.stats_layout = QVBoxLayout(self.stats_tab)
+        self.stats_text = QPlainTextEdit()
+        self.stats_text.setReadOnly(True)
+        self.stats_text.setPlaceholderText("Os tempos por etapa aparecem ao fim da análise.")
+        self.stats_layout.addWidget(self.stats_text)
+        
+        self.profile_check = QCheckBox("Perfilar a análise com cProfile (em um único processo)")
+        self.profile_check.setChecked(self.profile_analysis)
+        self.profile_check.toggled.connect(self.set_profile_analysis)
+        self.stats_layout.addWidget(self.profile_check)
+        
+        self.export_stats_btn = QPushButton("Exportar Estatísticas (JSON)")
+        self.export_stats_btn.setEnabled(False)
+        self.export_stats_btn.clicked.connect(self.export_stats)
+        self.stats_layout.addWidget(self.export_stats_btn)
+        
+        self.tabs.addTab(self.stats_tab, "Estatísticas")
+        
         # Adicionar TabWidget ao painel central
         center_panel.addWidget(self.tabs)
         
         # Painel direito para preview
         right_panel = QVBoxLayout()
-        right_panel.addWidget(QLabel('Visualização:'))
+        preview_header = QHBoxLayout()
+        preview_header.addWidget(QLabel('Visualização:'))
+        preview_header.addStretch(1)
+        
+        # Zoom da visualização, renderizado direto na escala escolhida
+        preview_header.addWidget(QLabel('Zoom:'))
+        self.zoom_combo = QComboBox(self)
+        self.zoom_combo.addItem('Ajustar à largura', None)
+        for zoom in PREVIEW_ZOOM_LEVELS:
+            self.zoom_combo.addItem(f"{zoom * 100:.0f}%", zoom)
+        self.zoom_combo.setCurrentIndex(max(0, self.zoom_combo.findData(self.preview_zoom)))
+        self.zoom_combo.currentIndexChanged.connect(self.on_zoom_changed)
+        preview_header.addWidget(self.zoom_combo)
+        right_panel.addLayout(preview_header)
         
         # Área de scroll para preview
         self.scroll_area = QScrollArea()
@@ -140,7 +393,22 @@ class PDFAnalyzerApp(QMainWindow):
         self.preview_layout = QVBoxLayout(self.preview_container)
         
         self.scroll_area.setWidget(self.preview_container)
-        right_panel.addWidget(self.scroll_area)
+        right_panel.addWidget(self.scroll_area, 1)
+        
+        # Faixa de miniaturas de todas as páginas; só as visíveis são renderizadas
+        self.thumbnail_model = ThumbnailModel(self.documents, self.pixmap_cache, parent=self)
+        self.thumbnail_view = QListView(self)
+        self.thumbnail_view.setModel(self.thumbnail_model)
+        self.thumbnail_view.setViewMode(QListView.IconMode)
+        self.thumbnail_view.setFlow(QListView.LeftToRight)
+        self.thumbnail_view.setWrapping(False)
+        self.thumbnail_view.setUniformItemSizes(True)
+        self.thumbnail_view.setMovement(QListView.Static)
+        self.thumbnail_view.setIconSize(self.thumbnail_model.thumbnail_size)
+        self.thumbnail_view.setSpacing(6)
+        self.thumbnail_view.setFixedHeight(self.thumbnail_model.thumbnail_size.height() + 60)
+        self.thumbnail_view.clicked.connect(self.on_thumbnail_clicked)
+        right_panel.addWidget(self.thumbnail_view)
         
         # Adicionar os painéis ao layout principal
         main_layout.addLayout(left_panel, 1)    # 1 parte para o painel esquerdo
@@ -153,26 +421,98 @@ class PDFAnalyzerApp(QMainWindow):
         self.setCentralWidget(central_widget)
         
         # Variáveis para armazenar dados das páginas
-        self.page_data = []
         self.log_messages = []
-        self.color_modes = []  # Para armazenar os modos de cor de cada página
+        
+        # Renderizar a página de novo só quando a janela parar de ser redimensionada
+        self.preview_resize_timer = QTimer(self)
+        self.preview_resize_timer.setSingleShot(True)
+        self.preview_resize_timer.setInterval(PREVIEW_RESIZE_DELAY_MS)
+        self.preview_resize_timer.timeout.connect(self.update_preview_image)
+
+    def show_ink_columns(self, visible):
+        """Mostra as colunas de cobertura de tinta na tabela de cores"""
+        for column in range(PageResultsModel.INK_COLUMNS, len(PageResultsModel.HEADERS)):
+            self.color_table.setColumnHidden(column, not visible)
 
     def load_config(self):
         """Carrega a configuração salva do arquivo"""
         self.poppler_path = None
+        self.analysis_workers = None  # None usa todos os núcleos disponíveis
+        self.cross_check_pypdf2 = False  # Conferir os boxes também com o PyPDF2
+        self.max_open_documents = DEFAULT_MAX_DOCUMENTS
+        self.display_list_cache_pages = DEFAULT_MAX_RENDERERS  # Páginas com a display list guardada
+        self.preview_zoom = None  # None ajusta a página à largura da visualização
+        self.preview_cache_mb = DEFAULT_PREVIEW_CACHE_MB
+        self.use_result_cache = True
+        self.color_settings = ColorSettings()  # Precisão x velocidade da detecção de cor
+        self.custom_paper_formats = {}  # Formatos próprios: nome -> [largura, altura] em mm
+        self.measure_stages = True  # Medir o tempo de cada etapa da análise
+        self.profile_analysis = False  # Perfilar a análise com o cProfile
         try:
             if os.path.exists(self.config_file):
                 with open(self.config_file, 'r') as f:
                     config = json.load(f)
                     self.poppler_path = config.get('poppler_path')
+                    self.analysis_workers = config.get('analysis_workers')
+                    self.cross_check_pypdf2 = config.get('cross_check_pypdf2', False)
+                    self.max_open_documents = config.get('max_open_documents', DEFAULT_MAX_DOCUMENTS)
+                    self.display_list_cache_pages = config.get('display_list_cache_pages', DEFAULT_MAX_RENDERERS)
+                    self.preview_zoom = nearest_zoom_level(config.get('preview_zoom'))
+                    self.preview_cache_mb = config.get('preview_cache_mb', DEFAULT_PREVIEW_CACHE_MB)
+                    self.use_result_cache = config.get('result_cache', True)
+                    defaults = ColorSettings()
+                    self.color_settings = ColorSettings(
+                        config.get('color_threshold', defaults.threshold),
+                        config.get('min_color_fraction', defaults.min_colored_fraction),
+                        config.get('color_coarse_pixels', defaults.coarse_pixels),
+                        config.get('color_refine_dpi', defaults.refine_dpi),
+                        config.get('ink_coverage', defaults.ink_coverage),
+                        config.get('ink_dpi', defaults.ink_dpi),
+                        config.get('tac_limit', defaults.tac_limit))
+                    self.custom_paper_formats = config.get('paper_formats', {})
+                    self.measure_stages = config.get('measure_stages', True)
+                    self.profile_analysis = config.get('profile_analysis', False)
         except Exception as e:
             print(f"Erro ao carregar configuração: {str(e)}")
+        
+        try:
+            self.paper_formats = PaperFormatRegistry(self.custom_paper_formats)
+        except Exception as e:
+            print(f"Erro nos formatos de papel da configuração: {str(e)}")
+            self.paper_formats = PaperFormatRegistry()
 
+    def open_result_cache(self):
+        """Abre o cache persistente de resultados, se estiver habilitado"""
+        if not self.use_result_cache:
+            return None
+        try:
+            return ResultCache(color_settings=self.color_settings, paper_formats=self.paper_formats)
+        except Exception as e:
+            print(f"Erro ao abrir o cache de resultados: {str(e)}")
+            return None
+    
     def save_config(self):
         """Salva a configuração atual em um arquivo"""
         try:
             config = {
-                'poppler_path': self.poppler_path
+                'poppler_path': self.poppler_path,
+                'analysis_workers': self.analysis_workers,
+                'cross_check_pypdf2': self.cross_check_pypdf2,
+                'max_open_documents': self.max_open_documents,
+                'display_list_cache_pages': self.display_list_cache_pages,
+                'preview_zoom': self.preview_zoom,
+                'preview_cache_mb': self.preview_cache_mb,
+                'result_cache': self.use_result_cache,
+                'color_threshold': self.color_settings.threshold,
+                'min_color_fraction': self.color_settings.min_colored_fraction,
+                'color_coarse_pixels': self.color_settings.coarse_pixels,
+                'color_refine_dpi': self.color_settings.refine_dpi,
+                'ink_coverage': self.color_settings.ink_coverage,
+                'ink_dpi': self.color_settings.ink_dpi,
+                'tac_limit': self.color_settings.tac_limit,
+                'paper_formats': self.custom_paper_formats,
+                'measure_stages': self.measure_stages,
+                'profile_analysis': self.profile_analysis
             }
             with open(self.config_file, 'w') as f:
                 json.dump(config, f)
@@ -183,8 +523,7 @@ class PDFAnalyzerApp(QMainWindow):
     def add_log_message(self, message, level="INFO"):
         """Adiciona uma mensagem ao log interno do aplicativo"""
         self.log_messages.append(f"{level}: {message}")
-        log_text = "<br/>".join(self.log_messages)
-        self.log_text.setText(f"<html><body>{log_text}</body></html>")
+        self.log_text.appendPlainText(f"{level}: {message}")
         
         # Também envia para o logger do sistema
         if hasattr(self, 'logger'):
@@ -229,224 +568,340 @@ class PDFAnalyzerApp(QMainWindow):
         if file_path:
             self.current_pdf_path = file_path
             self.analyze_pdf(file_path)
+    
+    def upload_pdf_quick(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, 'Verificação Rápida', '', 'Arquivos PDF (*.pdf)'
+        )
+        
+        if file_path:
+            self.current_pdf_path = file_path
+            self.quick_check_pdf(file_path)
+    
+    def reset_views(self):
+        """Limpa os resultados, a visualização e o log da análise anterior"""
+        self.thumbnail_model.set_document(None, 0)
+        self.results_model.clear()
+        self.clear_preview()
+        self.box_table.setRowCount(0)
+        self.close_report()
+        self.log_messages = []
+        self.log_text.clear()
+        self.format_alert.setText("")
+        self.color_alert.setText("")
+    
+    def quick_check_pdf(self, pdf_path):
+        """Veredito rápido: só os alertas de formatos e cores, sem a lista de páginas"""
+        self.stop_analysis()
+        self.reset_views()
+        self.add_log_message(f"Verificação rápida: {os.path.basename(pdf_path)}")
+        self.timings = instrumentacao.StageTimings() if self.measure_stages else None
+        self.profile_text = ""
+        
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.cancel_btn.setEnabled(True)
+        self.export_btn.setEnabled(False)
+        
+        self.analysis_thread = QThread(self)
+        self.analysis_worker = QuickVerdictWorker(self, pdf_path, self.timings)
+        self.analysis_worker.moveToThread(self.analysis_thread)
+        
+        self.analysis_thread.started.connect(self.analysis_worker.run)
+        self.analysis_worker.verdict_ready.connect(self.on_quick_verdict)
+        self.analysis_worker.log_message.connect(self.add_log_message)
+        self.analysis_worker.failed.connect(self.on_analysis_failed)
+        self.analysis_worker.finished.connect(self.on_quick_check_finished)
+        self.analysis_worker.finished.connect(self.analysis_thread.quit)
+        self.analysis_worker.finished.connect(self.analysis_worker.deleteLater)
+        self.analysis_thread.finished.connect(self.analysis_thread.deleteLater)
+        
+        self.analysis_thread.start()
+    
+    def on_quick_verdict(self, verdict):
+        file_name = os.path.basename(verdict.path)
+        if verdict.error:
+            self.info_label.setText(verdict.error)
+            self.add_log_message(verdict.error, "ERROR")
+            return
+        
+        if verdict.from_cache:
+            checked = "resultado do cache de análises"
+        else:
+            checked = (f"{verdict.pages_inspected} página(s) inspecionada(s), "
+                       f"{verdict.pages_rendered} renderizada(s)")
+        self.info_label.setText(f'Arquivo: {file_name}\nTotal de páginas: {verdict.num_pages}\n'
+                                f'Verificação rápida: {checked}')
+        if verdict.cancelled:
+            self.add_log_message("Verificação rápida cancelada; os alertas podem estar incompletos", "WARNING")
+        
+        if verdict.mixed_formats:
+            pages = ", ".join(f"{name} (página {page+1})" for name, page in verdict.formats.items())
+            self.format_alert.setText("ALERTA: O documento contém páginas com formatos diferentes!")
+            self.add_log_message(f"O documento contém páginas com formatos diferentes: {pages}", "WARNING")
+        if verdict.mixed_colors:
+            self.color_alert.setText("ALERTA: O documento contém páginas coloridas e preto e branco misturadas!")
+            self.add_log_message(
+                f"O documento contém páginas coloridas (página {verdict.color_modes['Colorido']+1}) "
+                f"e preto e branco (página {verdict.color_modes['Preto e Branco']+1}) misturadas", "INFO")
+    
+    def on_quick_check_finished(self, cancelled):
+        self.analysis_worker = None
+        self.analysis_thread = None
+        self.progress_bar.setVisible(False)
+        self.cancel_btn.setEnabled(False)
+        self.show_timings()
+    
     def analyze_pdf(self, pdf_path):
-        try:
-            # Limpar visualizações e logs anteriores
-            self.page_list.clear()
-            self.clear_preview()
-            self.box_table.setRowCount(0)
-            self.color_table.setRowCount(0)
-            self.page_data = []
-            self.color_modes = []
-            self.log_messages = []
-            self.log_text.setText("Nenhum erro ou aviso registrado.")
-            self.color_alert.setText("")
-            
-            # Adicionar primeira mensagem de log
-            self.add_log_message(f"Analisando arquivo: {os.path.basename(pdf_path)}")
-            
-            # Abrir o PDF e obter informações básicas
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                num_pages = len(pdf_reader.pages)
-                
-                # Atualizar informações básicas
-                file_name = os.path.basename(pdf_path)
-                self.info_label.setText(f'Arquivo: {file_name}\nTotal de páginas: {num_pages}')
-                
-                # Análise adicional com PyMuPDF para formatos problemáticos e detecção de cor
-                pymupdf_doc = fitz.open(pdf_path)
-                
-                # Analisar cada página
-                page_formats = []
-                
-                for i in range(num_pages):
-                    page = pdf_reader.pages[i]
-                    page_info = self.analyze_page_boxes(page, i)
-                    
-                    # Usar PyMuPDF como backup para obter tamanho da página
-                    if not page_info.get('MediaBox') and i < len(pymupdf_doc):
-                        pymupdf_page = pymupdf_doc[i]
-                        rect = pymupdf_page.rect
-                        width_pt = rect.width
-                        height_pt = rect.height
-                        width_mm = width_pt * 0.352778
-                        height_mm = height_pt * 0.352778
-                        
-                        page_info['MediaBox'] = {
-                            'width': width_mm,
-                            'height': height_mm,
-                            'x': 0,
-                            'y': 0,
-                            'raw': (0, 0, width_pt, height_pt),
-                            'source': 'PyMuPDF'  # Marcar que veio do PyMuPDF
-                        }
-                        
-                        self.add_log_message(f"Usando PyMuPDF para obter MediaBox na página {i+1}", "INFO")
-                    
-                    # Detectar modo de cor da página com PyMuPDF
-                    color_mode = self.detect_color_mode(pymupdf_doc, i)
-                    self.color_modes.append(color_mode)
-                    
-                    # Adicionar à tabela de cores
-                    row_position = self.color_table.rowCount()
-                    self.color_table.insertRow(row_position)
-                    self.color_table.setItem(row_position, 0, QTableWidgetItem(f"Página {i+1}"))
-                    self.color_table.setItem(row_position, 1, QTableWidgetItem(color_mode))
-                    
-                    self.page_data.append(page_info)
-                    
-                    # Determinar o formato (retrato, paisagem, etc.)
-                    mediabox = page_info.get('MediaBox')
-                    if mediabox:
-                        width, height = mediabox['width'], mediabox['height']
-                        if width > height:
-                            orientation = "Paisagem"
-                        else:
-                            orientation = "Retrato"
-                        
-                        # Formatos padrão de papel
-                        formato = self.determine_paper_format(width, height)
-                        format_info = f"{formato} ({orientation})"
-                        page_formats.append(format_info)
-                        
-                        # Adicionar à lista
-                        source = mediabox.get('source', 'PyPDF2')
-                        color_indicator = "🟣" if color_mode == "Colorido" else "⚫"
-                        self.page_list.addItem(f"{color_indicator} Página {i+1}: {format_info} [{source}]")
-                    else:
-                        self.page_list.addItem(f"Página {i+1}: Formato desconhecido")
-                        page_formats.append("Desconhecido")
-                        self.add_log_message(f"Não foi possível determinar o formato da página {i+1}", "WARNING")
-                
-                # Verificar se há formatos diferentes
-                if len(set(page_formats)) > 1:
-                    self.format_alert.setText("ALERTA: O documento contém páginas com formatos diferentes!")
-                    self.add_log_message("O documento contém páginas com formatos diferentes", "WARNING")
-                else:
-                    self.format_alert.setText("")
-                
-                # Verificar se há modos de cor diferentes
-                if "Colorido" in self.color_modes and "Preto e Branco" in self.color_modes:
-                    self.color_alert.setText("ALERTA: O documento contém páginas coloridas e preto e branco misturadas!")
-                    self.add_log_message("O documento contém páginas coloridas e preto e branco misturadas", "INFO")
-                
-                pymupdf_doc.close()
-            
-            # Gerar previews das páginas usando PyMuPDF
-            self.generate_preview_with_pymupdf(pdf_path, num_pages)
-            
-            # Selecionar a primeira página automaticamente
-            if num_pages > 0:
-                self.page_list.setCurrentRow(0)
-                
-                # Mostrar a tab de cores se houver mistura
-                if "Colorido" in self.color_modes and "Preto e Branco" in self.color_modes:
-                    self.tabs.setCurrentIndex(1)  # Índice da aba de cores
-                elif len(self.log_messages) > 1:
-                    self.tabs.setCurrentIndex(2)  # Índice da aba de logs
+        # Interromper uma análise anterior que ainda esteja em andamento
+        self.stop_analysis()
         
-        except Exception as e:
-            import traceback
-            error_msg = f"Erro ao analisar o PDF: {str(e)}"
-            self.info_label.setText(error_msg)
-            self.add_log_message(error_msg, "ERROR")
-            self.add_log_message(traceback.format_exc(), "ERROR")
-            QMessageBox.critical(self, "Erro", error_msg)
+        # Limpar visualizações e logs anteriores
+        self.reset_views()
+        
+        # Adicionar primeira mensagem de log
+        self.add_log_message(f"Analisando arquivo: {os.path.basename(pdf_path)}")
+        
+        # Preparar barra de progresso e botão de cancelamento
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.cancel_btn.setEnabled(True)
+        self.export_btn.setEnabled(True)
+        
+        # Tempos por etapa desta análise (no processo atual e nos workers)
+        self.timings = instrumentacao.StageTimings() if self.measure_stages else None
+        self.profile_text = ""
+        
+        # Executar a análise em uma thread separada
+        self.analysis_thread = QThread(self)
+        self.analysis_worker = AnalysisWorker(self, pdf_path, self.timings)
+        self.analysis_worker.moveToThread(self.analysis_thread)
+        
+        self.analysis_thread.started.connect(self.analysis_worker.run)
+        self.analysis_worker.analysis_started.connect(self.on_analysis_started)
+        self.analysis_worker.pages_analyzed.connect(self.on_pages_analyzed)
+        self.analysis_worker.progress.connect(self.on_analysis_progress)
+        self.analysis_worker.log_message.connect(self.add_log_message)
+        self.analysis_worker.failed.connect(self.on_analysis_failed)
+        self.analysis_worker.profile_ready.connect(self.on_profile_ready)
+        self.analysis_worker.finished.connect(self.on_analysis_finished)
+        self.analysis_worker.finished.connect(self.analysis_thread.quit)
+        self.analysis_worker.finished.connect(self.analysis_worker.deleteLater)
+        self.analysis_thread.finished.connect(self.analysis_thread.deleteLater)
+        
+        self.analysis_thread.start()
     
-    def detect_color_mode(self, pdf_document, page_index):
+    def cancel_analysis(self):
+        """Solicita o cancelamento da análise em andamento"""
+        if self.analysis_worker is not None:
+            self.analysis_worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.add_log_message("Cancelamento solicitado pelo usuário", "INFO")
+    
+    def export_report(self):
         """
-        Detecta se uma página é colorida ou preto e branco
+        Grava os resultados por página em CSV ou JSON Lines. As páginas já
+        analisadas são gravadas agora e as seguintes à medida que chegam.
         """
-        try:
-            page = pdf_document[page_index]
-            
-            # Renderizar a página em uma resolução baixa para análise rápida
-            pix = page.get_pixmap(matrix=fitz.Matrix(72/150, 72/150))
-            
-            # Verificar se o pixmap é colorido
-            if pix.colorspace and pix.colorspace.n >= 3:  # RGB ou CMYK
-                # Converter para array numpy para análise mais detalhada
-                img_array = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-                
-                # Se for CMYK (4 canais) ou RGB (3 canais)
-                if pix.n >= 3:
-                    # Verificar se há cores significativas
-                    # Removendo o canal alpha se existir
-                    color_channels = img_array[:, :, :3] if pix.n >= 3 else img_array
-                    
-                    # Calcular diferenças entre canais RGB
-                    max_diff = np.max(np.abs(color_channels[:,:,0] - color_channels[:,:,1]))
-                    max_diff = max(max_diff, np.max(np.abs(color_channels[:,:,0] - color_channels[:,:,2])))
-                    max_diff = max(max_diff, np.max(np.abs(color_channels[:,:,1] - color_channels[:,:,2])))
-                    
-                    # Se a diferença for significativa, é colorido
-                    if max_diff > 30:  # Threshold que pode ser ajustado
-                        return "Colorido"
-                
-                # Se chegou aqui, verificamos canais mas não achamos diferenças significativas
-                return "Preto e Branco"
-            else:
-                # Pixmap sem colorspace ou com apenas 1 canal
-                return "Preto e Branco"
+        if not self.current_pdf_path:
+            return
+        
+        base_name = os.path.splitext(self.current_pdf_path)[0]
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Exportar Relatório", base_name + ".csv",
+            "CSV (*.csv);;JSON Lines (*.jsonl)")
+        if not file_path:
+            return
         
+        self.close_report()
+        try:
+            # Vale a extensão digitada; o filtro escolhido só decide quando ela não é conhecida
+            report_format = detect_report_format(file_path, 'jsonl' if selected_filter.startswith("JSON") else 'csv')
+            self.report_writer = open_report(file_path, report_format)
+            for page_result in self.page_results:
+                self.report_writer.write(self.current_pdf_path, page_result)
         except Exception as e:
-            self.add_log_message(f"Erro ao detectar cor na página {page_index+1}: {str(e)}", "WARNING")
-            return "Desconhecido"
+            self.close_report()
+            QMessageBox.warning(self, "Aviso", f"Não foi possível exportar o relatório: {str(e)}")
+            return
+        
+        self.add_log_message(f"Exportando relatório para {file_path}", "INFO")
+        # Sem análise em andamento o relatório já está completo
+        if self.analysis_worker is None:
+            self.close_report()
+    
+    def close_report(self):
+        if self.report_writer is not None:
+            self.report_writer.close()
+            self.add_log_message(f"Relatório exportado: {self.report_writer.pages_written} página(s)", "INFO")
+            self.report_writer = None
     
-    def analyze_page_boxes(self, page, page_index):
-        page_info = {}
+    def stop_analysis(self):
+        """
+        Cancela a análise em andamento sem esperar a thread: ela termina
+        sozinha, depois da página atual, e é descartada ao terminar
+        """
+        worker, thread = self.analysis_worker, self.analysis_thread
+        self.analysis_worker = None
+        self.analysis_thread = None
+        if worker is None:
+            return
         
-        # Lista de possíveis boxes em um PDF
-        box_types = ['MediaBox', 'CropBox', 'BleedBox', 'TrimBox', 'ArtBox']
+        worker.cancel()
+        # Os sinais pendentes do worker antigo não devem alterar a nova análise
+        worker.disconnect()
+        worker.finished.connect(thread.quit)
+        worker.finished.connect(worker.deleteLater)
+        # Manter as referências até a thread terminar
+        self.retired_analyses.append((thread, worker))
+        thread.finished.connect(lambda: self.on_retired_analysis_finished(thread, worker))
+        if thread.isFinished():
+            self.on_retired_analysis_finished(thread, worker)
+    
+    def on_retired_analysis_finished(self, thread, worker):
+        if (thread, worker) in self.retired_analyses:
+            self.retired_analyses.remove((thread, worker))
+        if self.closing and not self.retired_analyses:
+            self.close()
+    
+    def on_analysis_started(self, num_pages):
+        # Atualizar informações básicas
+        file_name = os.path.basename(self.current_pdf_path or "")
+        self.info_label.setText(f'Arquivo: {file_name}\nTotal de páginas: {num_pages}')
+        self.progress_bar.setRange(0, max(num_pages, 1))
+        self.thumbnail_model.set_document(self.current_pdf_path, num_pages)
+    
+    def on_pages_analyzed(self, page_results):
+        first_batch = len(self.page_results) == 0
+        with instrumentacao.measure(self.timings, 'interface'):
+            self.show_pages(page_results)
+        # A visualização da primeira página é medida à parte, em render_page_pixmap()
+        if first_batch and len(self.page_results) > 0:
+            self.page_list.setCurrentIndex(self.results_model.index(0, PageResultsModel.DESCRIPTION_COLUMN))
+    
+    def show_pages(self, page_results):
+        if self.report_writer is not None:
+            for page_result in page_results:
+                self.report_writer.write(self.current_pdf_path, page_result)
         
-        for box_type in box_types:
-            try:
-                # Verificar se este tipo de box existe na página
-                if hasattr(page, box_type.lower()):
-                    box = getattr(page, box_type.lower())
-                    if box:
-                        # Converter todos os valores para float para evitar problemas com Decimal
-                        try:
-                            x1 = float(box[0])
-                            y1 = float(box[1])
-                            x2 = float(box[2])
-                            y2 = float(box[3])
-                        except (TypeError, ValueError) as e:
-                            # Se falhar a conversão direta, tentar ver se é Decimal
-                            if isinstance(box[0], decimal.Decimal):
-                                x1 = float(box[0])
-                                y1 = float(box[1])
-                                x2 = float(box[2])
-                                y2 = float(box[3])
-                            else:
-                                raise e
-                        
-                        width = abs(x2 - x1)
-                        height = abs(y2 - y1)
-                        
-                        # Converter de pontos para milímetros
-                        width_mm = width * 0.352778
-                        height_mm = height * 0.352778
-                        x1_mm = x1 * 0.352778
-                        y1_mm = y1 * 0.352778
-                        
-                        page_info[box_type] = {
-                            'width': width_mm,
-                            'height': height_mm,
-                            'x': x1_mm,
-                            'y': y1_mm,
-                            'raw': (x1, y1, x2, y2)
-                        }
-            except Exception as e:
-                error_msg = f"Erro ao analisar {box_type} na página {page_index+1}: {str(e)}"
-                self.add_log_message(error_msg, "WARNING")
+        # Uma atualização por lote na lista, na tabela de cores e nas miniaturas
+        self.results_model.append_results(page_results)
+        self.thumbnail_model.set_color_modes(page_results)
+        
+        # Os alertas aparecem assim que a mistura é encontrada, sem esperar o fim
+        self.update_alerts()
+    
+    def update_alerts(self):
+        """Atualiza os alertas de formatos e cores com as páginas analisadas até agora"""
+        mixed_formats = self.page_results.mixed_formats()
+        mixed_colors = self.page_results.mixed_colors()
+        self.format_alert.setText("ALERTA: O documento contém páginas com formatos diferentes!"
+                                  if mixed_formats else "")
+        self.color_alert.setText("ALERTA: O documento contém páginas coloridas e preto e branco misturadas!"
+                                 if mixed_colors else "")
+        return mixed_formats, mixed_colors
+    
+    def on_analysis_progress(self, done, total):
+        self.progress_bar.setValue(done)
+    
+    def on_analysis_failed(self, error_msg, details):
+        self.info_label.setText(error_msg)
+        self.add_log_message(error_msg, "ERROR")
+        self.add_log_message(details, "ERROR")
+        QMessageBox.critical(self, "Erro", error_msg)
+    
+    def on_analysis_finished(self, cancelled):
+        self.analysis_worker = None
+        self.analysis_thread = None
+        self.progress_bar.setVisible(False)
+        self.cancel_btn.setEnabled(False)
+        self.close_report()
+        
+        if cancelled:
+            self.add_log_message(f"Análise cancelada após {len(self.page_results)} página(s)", "WARNING")
+        self.show_timings()
+        
+        # Verificar se há formatos ou modos de cor diferentes
+        mixed_formats, mixed_colors = self.update_alerts()
+        if mixed_formats:
+            self.add_log_message("O documento contém páginas com formatos diferentes", "WARNING")
+        if mixed_colors:
+            self.add_log_message("O documento contém páginas coloridas e preto e branco misturadas", "INFO")
         
-        return page_info
+        num_pages = len(self.page_results)
+        if num_pages > 0:
+            # Mostrar a tab de cores se houver mistura
+            if mixed_colors:
+                self.tabs.setCurrentIndex(1)  # Índice da aba de cores
+            elif len(self.log_messages) > 1:
+                self.tabs.setCurrentIndex(2)  # Índice da aba de logs
+    
+    def show_timings(self):
+        """Mostra os tempos por etapa na aba de estatísticas e destaca no log as páginas lentas"""
+        self.export_stats_btn.setEnabled(self.timings is not None or bool(self.profile_text))
+        if self.timings is None:
+            self.stats_text.setPlainText(self.profile_text)
+            return
+        
+        lines = self.timings.summary_lines()
+        if self.profile_text:
+            lines += ["", "Perfil (cProfile):", self.profile_text]
+        self.stats_text.setPlainText("\n".join(lines))
+        
+        page_stats = self.timings.stages.get(instrumentacao.PAGE_STAGE)
+        if page_stats is not None:
+            self.add_log_message(f"Tempo de análise das páginas: {page_stats.total:.2f}s "
+                                 f"({page_stats.total / page_stats.count * 1000:.1f}ms por página)", "INFO")
+        for page_index, seconds, stages in self.timings.slowest():
+            if seconds >= instrumentacao.SLOW_PAGE_SECONDS:
+                self.add_log_message(f"Página {page_index+1} lenta: {seconds:.2f}s "
+                                     f"({instrumentacao.describe_stages(stages)})", "WARNING")
+    
+    def on_profile_ready(self, report):
+        self.profile_text = report
+    
+    def set_profile_analysis(self, enabled):
+        self.profile_analysis = enabled
+        self.save_config()
+    
+    def export_stats(self):
+        """Grava os tempos por etapa (e o perfil, se houver) em JSON"""
+        base_name = os.path.splitext(self.current_pdf_path or "analise")[0]
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Exportar Estatísticas", base_name + "_tempos.json", "JSON (*.json)")
+        if not file_path:
+            return
+        try:
+            timings = self.timings or instrumentacao.StageTimings()
+            timings.save_json(file_path, file=self.current_pdf_path, pages=len(self.page_results),
+                              profile=self.profile_text or None)
+            self.add_log_message(f"Estatísticas exportadas para {file_path}", "INFO")
+        except Exception as e:
+            QMessageBox.warning(self, "Aviso", f"Não foi possível exportar as estatísticas: {str(e)}")
+    
+    def closeEvent(self, event):
+        self.stop_analysis()
+        self.close_report()
+        self.thumbnail_model.shutdown()
+        if self.retired_analyses:
+            # Os documentos só são fechados quando as análises canceladas terminarem
+            self.closing = True
+            self.hide()
+            event.ignore()
+            return
+        self.documents.close()
+        super().closeEvent(event)
+    
     def on_page_selected(self, current_row):
-        if current_row >= 0 and current_row < len(self.page_data):
+        if current_row >= 0 and current_row < len(self.page_results):
+            # Manter a miniatura correspondente selecionada e visível
+            thumbnail_index = self.thumbnail_model.index(current_row)
+            self.thumbnail_view.setCurrentIndex(thumbnail_index)
+            self.thumbnail_view.scrollTo(thumbnail_index)
+            
             # Atualizar a tabela de boxes para a página selecionada
-            page_info = self.page_data[current_row]
+            page_info = self.page_results.boxes(current_row)
             self.update_box_table(page_info)
             
             # Atualizar o preview para mostrar apenas a página selecionada
@@ -454,6 +909,11 @@ class PDFAnalyzerApp(QMainWindow):
                 self.clear_preview()
                 self.generate_single_page_preview(self.current_pdf_path, current_row)
     
+    def on_thumbnail_clicked(self, index):
+        # As páginas só podem ser selecionadas depois de analisadas
+        if index.row() < self.results_model.rowCount():
+            self.page_list.setCurrentIndex(self.results_model.index(index.row(), PageResultsModel.DESCRIPTION_COLUMN))
+    
     def update_box_table(self, page_info):
         self.box_table.setRowCount(0)
         
@@ -471,96 +931,72 @@ class PDFAnalyzerApp(QMainWindow):
             self.box_table.setItem(row_position, 3, QTableWidgetItem(f"{box_data['x']:.2f}"))
             self.box_table.setItem(row_position, 4, QTableWidgetItem(f"{box_data['y']:.2f}"))
     
-    def determine_paper_format(self, width_mm, height_mm):
-        # Ordenar para que width seja sempre o menor valor
-        width_mm, height_mm = min(width_mm, height_mm), max(width_mm, height_mm)
-        
-        # Tolerância para comparações (em mm)
-        tolerance = 5
-        
-        # Verificar formatos comuns
-        if abs(width_mm - 210) < tolerance and abs(height_mm - 297) < tolerance:
-            return "A4"
-        elif abs(width_mm - 216) < tolerance and abs(height_mm - 279) < tolerance:
-            return "Carta"
-        elif abs(width_mm - 216) < tolerance and abs(height_mm - 356) < tolerance:
-            return "Ofício"
-        elif abs(width_mm - 297) < tolerance and abs(height_mm - 420) < tolerance:
-            return "A3"
-        elif abs(width_mm - 148) < tolerance and abs(height_mm - 210) < tolerance:
-            return "A5"
-        else:
-            return f"Personalizado ({width_mm:.1f}mm x {height_mm:.1f}mm)"
-    
-    def generate_preview_with_pymupdf(self, pdf_path, num_pages):
-        try:
-            # Usar PyMuPDF (fitz) para gerar previews de todas as páginas
-            pdf_document = fitz.open(pdf_path)
-            max_pages = min(num_pages, 10)  # Limitar a 10 páginas para melhor desempenho
-            
-            for i in range(max_pages):
-                # Obter a página
-                page = pdf_document.load_page(i)
-                
-                # Renderizar em um pixmap
-                pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))  # Escala de 0.5 para reduzir tamanho
-                
-                # Converter para QImage e QPixmap
-                img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(img)
-                
-                # Adicionar imagem ao layout de visualização
-                preview_label = QLabel()
-                preview_label.setPixmap(pixmap)
-                preview_label.setAlignment(Qt.AlignCenter)
-                
-                # Adicionar título da página com informação de cor
-                color_mode = self.color_modes[i] if i < len(self.color_modes) else "Desconhecido"
-                color_indicator = "🟣" if color_mode == "Colorido" else "⚫"
-                
-                page_title = QLabel(f"Página {i+1} {color_indicator} ({color_mode})")
-                page_title.setAlignment(Qt.AlignCenter)
-                page_title.setStyleSheet("font-weight: bold; margin-top: 15px;")
-                
-                self.preview_layout.addWidget(page_title)
-                self.preview_layout.addWidget(preview_label)
+    def render_page_pixmap(self, pdf_path, page_index, zoom, rotation=0):
+        """
+        Renderiza a página como QPixmap, reaproveitando renderizações recentes do cache
+        """
+        key = (os.path.abspath(pdf_path), DocumentSession.file_identity(pdf_path),
+               page_index, zoom, rotation)
+        pixmap = self.pixmap_cache.get(key)
+        
+        if pixmap is None:
+            # Durante a análise, a visualização entra nos tempos como uma etapa própria
+            timings = self.timings if self.analysis_worker is not None else None
+            with self.documents.document(pdf_path), instrumentacao.measure(timings, 'visualizacao'):
+                # Renderizada em blocos a partir da display list compartilhada com as
+                # miniaturas, com a escala limitada em páginas de grande formato
+                img = render_page_image(self.documents.page_renderer(pdf_path, page_index), zoom, rotation)
             
-            pdf_document.close()
+            pixmap = QPixmap.fromImage(img)
+            self.pixmap_cache.put(key, pixmap, pixmap.width() * pixmap.height() * pixmap.depth() // 8)
         
+        return pixmap
+    
+    def preview_zoom_for(self, pdf_path, page_index):
+        """Escala da visualização: a do zoom escolhido ou a que ajusta a página à largura"""
+        if self.preview_zoom is not None:
+            return self.preview_zoom
+        with self.documents.document(pdf_path):
+            page_width = self.documents.page_renderer(pdf_path, page_index).rect.width
+        # Arredondada para que pequenas mudanças de largura reaproveitem o cache
+        return round(max(1, self.scroll_area.viewport().width() - 30) / max(1.0, page_width), 2)
+    
+    def update_preview_image(self):
+        """Renderiza de novo a página exibida na escala atual, a partir da display list guardada"""
+        if self.preview_label is None or self.preview_page is None or not self.current_pdf_path:
+            return
+        try:
+            zoom = self.preview_zoom_for(self.current_pdf_path, self.preview_page)
+            self.preview_label.setPixmap(self.render_page_pixmap(self.current_pdf_path, self.preview_page, zoom))
         except Exception as e:
-            error_msg = f"Erro ao gerar previews: {str(e)}"
-            self.add_log_message(error_msg, "ERROR")
-            error_label = QLabel(error_msg)
-            error_label.setStyleSheet("color: red;")
-            self.preview_layout.addWidget(error_label)
+            self.add_log_message(f"Erro ao gerar preview: {str(e)}", "ERROR")
+    
+    def on_zoom_changed(self, index):
+        self.preview_zoom = self.zoom_combo.itemData(index)
+        self.save_config()
+        self.update_preview_image()
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.preview_zoom is None and self.preview_label is not None:
+            self.preview_resize_timer.start()
     
     def generate_single_page_preview(self, pdf_path, page_index):
         try:
-            # Gerar preview apenas para a página selecionada
-            pdf_document = fitz.open(pdf_path)
-            
-            # Obter a página
-            page = pdf_document.load_page(page_index)
-            
-            # Renderizar em um pixmap com escala maior por ser apenas uma página
-            pix = page.get_pixmap(matrix=fitz.Matrix(1.0, 1.0))
-            
-            # Converter para QImage e QPixmap
-            img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(img)
-            
-            # Redimensionar para caber na área de visualização
-            pixmap = pixmap.scaled(self.scroll_area.width() - 30, 
-                                  int(self.scroll_area.width() * pixmap.height() / pixmap.width()),
-                                  Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            # Gerar preview apenas para a página selecionada, renderizada direto na escala
+            # da visualização (sem redimensionar a imagem depois)
+            zoom = self.preview_zoom_for(pdf_path, page_index)
+            pixmap = self.render_page_pixmap(pdf_path, page_index, zoom)
             
             # Adicionar imagem ao layout de visualização
             preview_label = QLabel()
             preview_label.setPixmap(pixmap)
             preview_label.setAlignment(Qt.AlignCenter)
+            self.preview_label = preview_label
+            self.preview_page = page_index
             
             # Adicionar título da página com informação de cor
-            color_mode = self.color_modes[page_index] if page_index < len(self.color_modes) else "Desconhecido"
+            color_mode = self.page_results.color_mode(page_index) if page_index < len(self.page_results) else "Desconhecido"
             color_indicator = "🟣" if color_mode == "Colorido" else "⚫"
             
             page_title = QLabel(f"Página {page_index+1} {color_indicator} ({color_mode})")
@@ -575,8 +1011,6 @@ class PDFAnalyzerApp(QMainWindow):
             
             # Adicionar detalhes sobre o modo de cor
             self.add_color_visualization(page_index)
-            
-            pdf_document.close()
         
         except Exception as e:
             error_msg = f"Erro ao gerar preview: {str(e)}"
@@ -589,8 +1023,8 @@ class PDFAnalyzerApp(QMainWindow):
         """
         Adiciona uma explicação visual dos diferentes boxes
         """
-        if page_index < len(self.page_data):
-            page_info = self.page_data[page_index]
+        if page_index < len(self.page_results):
+            page_info = self.page_results.boxes(page_index)
             
             if page_info:
                 box_info_label = QLabel()
@@ -632,8 +1066,8 @@ class PDFAnalyzerApp(QMainWindow):
         """
         Adiciona uma explicação do modo de cor detectado
         """
-        if page_index < len(self.color_modes):
-            color_mode = self.color_modes[page_index]
+        if page_index < len(self.page_results):
+            color_mode = self.page_results.color_mode(page_index)
             
             color_info_label = QLabel()
             color_info_label.setWordWrap(True)
@@ -649,12 +1083,21 @@ class PDFAnalyzerApp(QMainWindow):
                 color_text += "<b>Detalhes:</b><br>"
                 color_text += "• A página contém apenas elementos em escala de cinza<br>"
                 color_text += "• Adequada para impressão em preto e branco<br>"
+
+            ink = self.page_results.ink_coverage(page_index)
+            if ink is not None:
+                color_text += f"<br><b>Cobertura de tinta:</b> {ink.describe()}<br>"
+                if ink.tac_over_limit:
+                    color_text += (f"• {ink.tac_over_limit * 100:.2f}% da área acima do limite de "
+                                   f"{self.color_settings.tac_limit * 100:.0f}%<br>")
             
             color_info_label.setText(color_text)
             self.preview_layout.addWidget(color_info_label)
     
     def clear_preview(self):
         # Limpar layout de preview
+        self.preview_label = None
+        self.preview_page = None
         while self.preview_layout.count():
             item = self.preview_layout.takeAt(0)
             widget = item.widget()
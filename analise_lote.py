@@ -0,0 +1,212 @@
+"""Análise em lote de PDFs pela linha de comando, sem interface gráfica"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import instrumentacao
+from cache_resultados import DEFAULT_CACHE_FILE, ResultCache
+from formatos_papel import PaperFormatRegistry, load_custom_formats
+from nucleo_analise import ColorSettings, DocumentResult, analyze_document, default_log
+from veredito_rapido import QuickVerdict, quick_verdict
+
+# Cache de resultados aberto por cada processo worker
+_result_caches = {}
+
+
+def iter_pdf_paths(inputs, recursive=False):
+    """
+    Expande arquivos, diretórios e padrões glob em caminhos de PDF, sem
+    montar a lista completa em memória
+    """
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                candidates = (os.path.join(root, name)
+                              for root, _, names in os.walk(item)
+                              for name in sorted(names))
+            else:
+                candidates = (os.path.join(item, name) for name in sorted(os.listdir(item)))
+            candidates = (path for path in candidates if path.lower().endswith('.pdf'))
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob.iglob(item, recursive=True))
+
+        for path in candidates:
+            if os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                yield path
+
+
+def add_color_arguments(parser):
+    """
+    Acrescenta ao parser as opções de ColorSettings, compartilhadas pelas
+    linhas de comando de lote e de exportação
+    """
+    parser.add_argument('--color-threshold', type=int, default=ColorSettings.threshold,
+                        help="Diferença mínima entre canais de um pixel colorido (padrão: %(default)s)")
+    parser.add_argument('--min-color-fraction', type=float, default=ColorSettings.min_colored_fraction,
+                        help="Fração mínima da área colorida para a página ser colorida (padrão: %(default)s)")
+    parser.add_argument('--color-pixels', type=int, default=ColorSettings.coarse_pixels,
+                        help="Pixels da primeira renderização de cada página (padrão: %(default)s)")
+    parser.add_argument('--color-dpi', type=float, default=ColorSettings.refine_dpi,
+                        help="Resolução das regiões suspeitas de cor (padrão: %(default)s)")
+    parser.add_argument('--ink-coverage', action='store_true',
+                        help="Medir a cobertura de tinta (C, M, Y, K e TAC) de cada página")
+    parser.add_argument('--ink-dpi', type=float, default=ColorSettings.ink_dpi,
+                        help="Resolução da medição da cobertura de tinta (padrão: %(default)s)")
+    parser.add_argument('--tac-limit', type=float, default=ColorSettings.tac_limit * 100,
+                        help="Cobertura total máxima de tinta, em %% (padrão: %(default)s)")
+
+
+def color_settings_from_args(args):
+    """Monta o ColorSettings a partir das opções de add_color_arguments"""
+    return ColorSettings(args.color_threshold, args.min_color_fraction,
+                         args.color_pixels, args.color_dpi, ink_coverage=args.ink_coverage,
+                         ink_dpi=args.ink_dpi, tac_limit=args.tac_limit / 100)
+
+
+def analyze_file(pdf_path, cross_check=False, cache_file=None, color_settings=None, paper_formats=None,
+                 quick=False, measure=False):
+    """
+    Executa a mesma análise de boxes, formato e cor da interface e retorna
+    um registro serializável em JSON. Com quick, apenas o veredito rápido
+    (formatos e cores misturados) é calculado; com measure, o registro
+    inclui os tempos por etapa.
+    """
+    timings = instrumentacao.StageTimings() if measure else None
+    with instrumentacao.activated(timings):
+        try:
+            cache = None
+            if cache_file:
+                key = (cache_file, color_settings, paper_formats and paper_formats.cache_key())
+                cache = _result_caches.get(key)
+                if cache is None:
+                    cache = _result_caches[key] = ResultCache(cache_file, color_settings, paper_formats)
+
+            with instrumentacao.stage('arquivo'):
+                if quick:
+                    record = quick_verdict(pdf_path, color_settings, paper_formats, cache=cache).to_dict()
+                else:
+                    record = analyze_document(pdf_path, workers=1, cross_check=cross_check, cache=cache,
+                                              color_settings=color_settings, paper_formats=paper_formats).to_dict()
+        except Exception as e:
+            record = error_record(pdf_path, f"Erro ao abrir o cache de análises: {str(e)}", quick)
+    if timings is not None:
+        record['timings'] = timings.snapshot()
+    return record
+
+
+def error_record(pdf_path, error, quick=False):
+    """Registro de um arquivo que não pôde ser analisado, no formato do resultado normal"""
+    result = QuickVerdict(pdf_path) if quick else DocumentResult(pdf_path)
+    result.error = error
+    return result.to_dict()
+
+
+def run_batch(paths, output, workers=None, cross_check=False, cache_file=None, color_settings=None,
+              paper_formats=None, quick=False, measure=False):
+    """
+    Analisa os arquivos em paralelo, com no máximo 2x workers tarefas
+    pendentes, e grava uma linha JSON por arquivo à medida que terminam.
+    Retorna a quantidade de arquivos com erro.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    max_pending = workers * 2
+    failures = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}  # Future -> caminho do arquivo
+        paths = iter(paths)
+        exhausted = False
+
+        while pending or not exhausted:
+            # Manter a fila limitada para não carregar milhares de tarefas de uma vez
+            while not exhausted and len(pending) < max_pending:
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                else:
+                    future = executor.submit(analyze_file, path, cross_check, cache_file,
+                                             color_settings, paper_formats, quick, measure)
+                    pending[future] = path
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # Um worker que falhou não deve interromper o restante do lote
+                    record = error_record(path, f"Erro ao analisar o PDF: {str(e)}", quick)
+                if record['error']:
+                    failures += 1
+                    default_log(f"{record['file']}: {record['error']}", "ERROR")
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analisa boxes, formatos e modos de cor de PDFs sem interface gráfica")
+    parser.add_argument('inputs', nargs='+', help="Arquivos PDF, diretórios ou padrões glob")
+    parser.add_argument('-o', '--output', help="Arquivo JSON Lines de saída (padrão: saída padrão)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Número de processos (padrão: todos os núcleos)")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help="Percorrer subdiretórios")
+    parser.add_argument('--cross-check', action='store_true',
+                        help="Conferir os boxes também com o PyPDF2 (mais lento)")
+    parser.add_argument('--quick', action='store_true',
+                        help="Apenas o veredito rápido: parar assim que formatos e cores misturados estiverem decididos")
+    parser.add_argument('--timings', action='store_true',
+                        help="Incluir no resultado os tempos por etapa e as páginas mais lentas")
+    add_color_arguments(parser)
+    parser.add_argument('--paper-formats',
+                        help='Arquivo JSON com formatos de papel próprios: {"nome": [largura, altura]} em mm')
+    parser.add_argument('--cache-file', default=DEFAULT_CACHE_FILE,
+                        help="Banco SQLite do cache de resultados (padrão: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Analisar todos os arquivos sem usar o cache de resultados")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(name)s - %(levelname)s - %(message)s')
+
+    color_settings = color_settings_from_args(args)
+
+    paper_formats = None
+    if args.paper_formats:
+        paper_formats = PaperFormatRegistry(load_custom_formats(args.paper_formats))
+
+    cache_file = None
+    if not args.no_cache:
+        # Criar as tabelas antes de iniciar os workers
+        try:
+            cache_file = ResultCache(args.cache_file, color_settings, paper_formats).db_path
+        except Exception as e:
+            default_log(f"Cache de análises indisponível, analisando sem cache: {str(e)}", "WARNING")
+
+    paths = iter_pdf_paths(args.inputs, recursive=args.recursive)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            failures = run_batch(paths, output, args.workers, args.cross_check, cache_file,
+                                 color_settings, paper_formats, args.quick, args.timings)
+    else:
+        failures = run_batch(paths, sys.stdout, args.workers, args.cross_check, cache_file,
+                             color_settings, paper_formats, args.quick, args.timings)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
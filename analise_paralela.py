@@ -0,0 +1,191 @@
+"""Análise de páginas em paralelo usando múltiplos processos"""
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import instrumentacao
+from nucleo_analise import (analyze_page, count_pages, default_log, describe_page_formats,
+                            iter_page_results, iter_pypdf2_pages, next_pypdf2_page)
+
+# Abaixo dessa quantidade de páginas por processo o custo de iniciar o pool não compensa
+MIN_PAGES_PER_WORKER = 8
+
+# Limite de páginas por tarefa, para que os resultados cheguem aos poucos
+MAX_CHUNK_SIZE = 50
+
+# Tamanho da primeira tarefa, para que as primeiras páginas apareçam logo
+FIRST_CHUNK_SIZE = 2
+
+# Intervalo entre as consultas ao cancelamento enquanto se espera um worker (s)
+CANCEL_POLL_INTERVAL = 0.1
+
+# Documentos mantidos abertos pelo processo worker atual
+_worker_documents = {}
+
+# Event do multiprocessing sinalizado quando a análise é cancelada
+_worker_cancel_event = None
+
+
+def _init_worker(cancel_event):
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def _never_cancelled():
+    return False
+
+
+def _open_worker_documents(pdf_path, cross_check=False):
+    """
+    Abre (uma única vez por processo) o PDF com PyMuPDF e, na verificação
+    cruzada, também com PyPDF2
+    """
+    import fitz  # PyMuPDF
+
+    key = (pdf_path, cross_check)
+    documents = _worker_documents.get(key)
+    if documents is None:
+        for pymupdf_doc, _ in _worker_documents.values():
+            pymupdf_doc.close()
+        _worker_documents.clear()
+
+        pdf_reader = None
+        if cross_check:
+            import PyPDF2
+            pdf_reader = PyPDF2.PdfReader(pdf_path)
+        documents = (fitz.open(pdf_path), pdf_reader)
+        _worker_documents[key] = documents
+    return documents
+
+
+def analyze_page_range(pdf_path, start, stop, cross_check=False, color_settings=None,
+                       paper_formats=None, measure=False):
+    """
+    Analisa as páginas [start, stop) dentro de um processo worker.
+    Retorna a lista de PageResult, as mensagens de log geradas e, com
+    measure, o snapshot dos tempos por etapa (senão None). Se a análise for
+    cancelada, o intervalo é interrompido entre as páginas. Os formatos das
+    páginas do intervalo são classificados juntos, no final.
+    """
+    pymupdf_doc, pdf_reader = _open_worker_documents(pdf_path, cross_check)
+    timings = instrumentacao.StageTimings() if measure else None
+    logs = []
+    def log(message, level="INFO"):
+        logs.append((message, level))
+
+    # Só a parte da árvore de páginas até este intervalo é lida pelo PyPDF2
+    pypdf2_pages = iter_pypdf2_pages(pdf_reader, start, stop) if pdf_reader is not None else None
+    results = []
+    with instrumentacao.activated(timings):
+        for i in range(start, stop):
+            if _worker_cancel_event is not None and _worker_cancel_event.is_set():
+                break
+            pypdf2_page = next_pypdf2_page(pypdf2_pages, i, log)
+            results.append(analyze_page(pymupdf_doc, i, log=log, pypdf2_page=pypdf2_page,
+                                        color_settings=color_settings, paper_formats=paper_formats,
+                                        classify_format=False))
+        describe_page_formats(results, paper_formats)
+    return results, logs, timings and timings.snapshot()
+
+
+class ParallelAnalyzer:
+    """
+    Distribui a análise das páginas entre processos. Cada processo abre sua
+    própria cópia do documento e analisa intervalos de páginas; os resultados
+    são devolvidos na ordem das páginas.
+    """
+
+    def __init__(self, workers=None, chunk_size=None, cross_check=False, session=None,
+                 color_settings=None, paper_formats=None, timings=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.cross_check = cross_check  # Conferir os boxes também com o PyPDF2
+        self.session = session  # DocumentSession usada na análise dentro do processo atual
+        self.color_settings = color_settings  # ColorSettings da detecção de cor
+        self.paper_formats = paper_formats  # PaperFormatRegistry com os formatos reconhecidos
+        # StageTimings que recebe os tempos dos workers; na thread atual os
+        # tempos vão para o StageTimings ativo (instrumentacao.activate)
+        self.timings = timings
+
+    def count_pages(self, pdf_path):
+        if self.session is not None:
+            return self.session.page_count(pdf_path)
+        return count_pages(pdf_path)
+
+    def page_ranges(self, num_pages, workers):
+        """Divide as páginas em intervalos (início, fim) para os workers"""
+        chunk_size = self.chunk_size
+        first = chunk_size
+        if not chunk_size:
+            # Algumas tarefas por worker para equilibrar páginas mais pesadas
+            chunk_size = min(MAX_CHUNK_SIZE, math.ceil(num_pages / (workers * 4)))
+            first = FIRST_CHUNK_SIZE
+        chunk_size = max(1, chunk_size)
+        first = max(1, min(first, chunk_size, num_pages))
+        return [(0, first)] + [(start, min(start + chunk_size, num_pages))
+                               for start in range(first, num_pages, chunk_size)]
+
+    def analyze(self, pdf_path, num_pages, log=None, cancelled=None):
+        """
+        Gera um PageResult para cada página, em ordem. cancelled é uma função
+        consultada enquanto se esperam os workers; fechar o gerador ou
+        cancelar interrompe os workers entre as páginas, sem esperar o fim dos
+        intervalos em andamento.
+        """
+        log = log or default_log
+        cancelled = cancelled or _never_cancelled
+        workers = min(self.workers, max(1, num_pages // MIN_PAGES_PER_WORKER))
+
+        if workers <= 1:
+            for page_result in iter_page_results(pdf_path, 0, num_pages, log=log,
+                                                 cross_check=self.cross_check, session=self.session,
+                                                 color_settings=self.color_settings,
+                                                 paper_formats=self.paper_formats):
+                if cancelled():
+                    return
+                yield page_result
+            return
+
+        # "spawn" evita herdar o estado de threads do processo principal (Qt)
+        context = multiprocessing.get_context("spawn")
+        cancel_event = context.Event()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=_init_worker, initargs=(cancel_event,))
+        try:
+            ranges = iter(self.page_ranges(num_pages, workers))
+            pending = deque()
+
+            # Poucas tarefas à frente do consumo: os resultados já entregues são
+            # liberados e a memória não cresce com o tamanho do documento
+            while True:
+                while len(pending) < workers * 2:
+                    page_range = next(ranges, None)
+                    if page_range is None:
+                        break
+                    pending.append(executor.submit(analyze_page_range, pdf_path, *page_range,
+                                                   self.cross_check, self.color_settings,
+                                                   self.paper_formats, self.timings is not None))
+                if not pending:
+                    break
+
+                # Consumir na ordem de envio mantém as páginas ordenadas
+                future = pending.popleft()
+                while True:
+                    if cancelled():
+                        return
+                    try:
+                        results, logs, timings = future.result(timeout=CANCEL_POLL_INTERVAL)
+                        break
+                    except TimeoutError:
+                        continue
+                for message, level in logs:
+                    log(message, level)
+                if timings is not None:
+                    self.timings.merge(timings)
+                yield from results
+        finally:
+            # Os workers param na próxima página; não é preciso esperar por eles
+            cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
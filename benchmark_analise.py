@@ -0,0 +1,387 @@
+"""
+Benchmark das etapas da análise sobre um corpus de PDFs sintéticos.
+
+Os PDFs são gerados localmente com o PyMuPDF (sem arquivos externos), com
+quantidade de páginas, tamanhos de papel, boxes, conteúdo vetorial ou raster
+e proporção de páginas coloridas configuráveis. Cada etapa (abertura, boxes,
+cor, miniaturas...) roda em um processo novo, para que o pico de memória
+medido seja só dela.
+
+    python benchmark_analise.py --pages 200 -o atual.json
+    python benchmark_analise.py --pages 200 --compare atual.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Tamanhos de página do corpus, em pontos (largura, altura)
+CORPUS_PAGE_SIZES = [
+    (595, 842),    # A4 retrato
+    (842, 595),    # A4 paisagem
+    (842, 1191),   # A3
+    (612, 792),    # Carta
+    (850, 850),    # Personalizado (300 x 300 mm)
+]
+
+# Perfis do corpus: fração de páginas com imagem (raster) e de páginas coloridas
+CORPUS_PROFILES = {
+    'vetorial': {'raster_fraction': 0.0, 'color_fraction': 0.5},
+    'raster': {'raster_fraction': 1.0, 'color_fraction': 0.5},
+    'misto': {'raster_fraction': 0.3, 'color_fraction': 0.3},
+}
+
+# Tamanho (em pixels) das imagens inseridas nas páginas raster
+IMAGE_SIZE = 512
+
+# Tamanho máximo das miniaturas, como na faixa de miniaturas da interface
+THUMBNAIL_SIZE = (120, 160)
+
+# Escala da visualização de página única da interface
+PREVIEW_ZOOM = 1.0
+
+# Diferença a partir da qual a comparação com um resultado anterior é destacada
+REGRESSION_TOLERANCE = 0.10
+
+
+def _synthetic_image(rng, colored):
+    """Pixmap RGB com um degradê e ruído; sem cor, os três canais são iguais"""
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    y, x = np.mgrid[0:IMAGE_SIZE, 0:IMAGE_SIZE]
+    noise = np.random.default_rng(rng.randrange(1 << 32)).integers(0, 32, (IMAGE_SIZE, IMAGE_SIZE))
+    gray = ((x + y) * 255 // (2 * IMAGE_SIZE) + noise).clip(0, 255).astype(np.uint8)
+    if colored:
+        pixels = np.dstack([gray, 255 - gray, (x * 255 // IMAGE_SIZE).astype(np.uint8)])
+    else:
+        # Escaneado em RGB, mas cinza: só a renderização decide
+        pixels = np.dstack([gray, gray, gray])
+    return fitz.Pixmap(fitz.csRGB, IMAGE_SIZE, IMAGE_SIZE, np.ascontiguousarray(pixels).tobytes(), 0)
+
+
+def _draw_vector_content(page, rng, colored):
+    """Texto, retângulos e linhas, em cor ou em tons de cinza"""
+    import fitz  # PyMuPDF
+
+    width, height = page.rect.width, page.rect.height
+    ink = (0.8, 0.1, 0.1) if colored else (0.3, 0.3, 0.3)
+    page.insert_text((40, 60), f"Página sintética {page.number + 1}", fontsize=18)
+    for line in range(int(height - 140) // 14):
+        page.insert_text((40, 100 + line * 14), "Lorem ipsum dolor sit amet " * 3, fontsize=9)
+    for _ in range(rng.randint(3, 12)):
+        x, y = rng.uniform(0, width - 80), rng.uniform(0, height - 80)
+        page.draw_rect(fitz.Rect(x, y, x + rng.uniform(10, 80), y + rng.uniform(10, 80)),
+                       color=ink, fill=ink if rng.random() < 0.5 else None)
+    page.draw_line((40, height - 40), (width - 40, height - 40), color=(0, 0, 0))
+
+
+def _set_boxes(page, rng):
+    """Define CropBox, BleedBox e TrimBox em parte das páginas, como em arquivos de gráfica"""
+    import fitz  # PyMuPDF
+
+    variant = rng.randrange(3)
+    if variant == 0:
+        return  # Só o MediaBox
+    rect = page.rect
+    bleed = fitz.Rect(rect.x0 + 9, rect.y0 + 9, rect.x1 - 9, rect.y1 - 9)
+    trim = fitz.Rect(bleed.x0 + 9, bleed.y0 + 9, bleed.x1 - 9, bleed.y1 - 9)
+    page.set_cropbox(bleed)
+    page.set_bleedbox(bleed)
+    if variant == 2:
+        page.set_trimbox(trim)
+
+
+def generate_synthetic_pdf(path, pages=100, raster_fraction=0.3, color_fraction=0.5,
+                           page_sizes=None, seed=0):
+    """
+    Gera um PDF sintético em path. raster_fraction e color_fraction são as
+    frações de páginas com imagem e de páginas coloridas; os tamanhos são
+    sorteados entre page_sizes (padrão: CORPUS_PAGE_SIZES).
+    """
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    page_sizes = page_sizes or CORPUS_PAGE_SIZES
+    images = {}  # Colorida/cinza -> xref, para inserir cada imagem uma única vez
+
+    with fitz.open() as pdf_document:
+        for _ in range(pages):
+            width, height = rng.choice(page_sizes)
+            page = pdf_document.new_page(width=width, height=height)
+            colored = rng.random() < color_fraction
+
+            if rng.random() < raster_fraction:
+                image_rect = fitz.Rect(36, 36, width - 36, height - 36)
+                if colored in images:
+                    page.insert_image(image_rect, xref=images[colored])
+                else:
+                    images[colored] = page.insert_image(image_rect, pixmap=_synthetic_image(rng, colored))
+            else:
+                _draw_vector_content(page, rng, colored)
+            _set_boxes(page, rng)
+
+        pdf_document.save(path, garbage=3, deflate=True)
+    return path
+
+
+def generate_corpus(directory, pages=100, profiles=None, seed=0):
+    """Gera um PDF por perfil de CORPUS_PROFILES e retorna {perfil: caminho}"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = {}
+    for name in profiles or CORPUS_PROFILES:
+        path = os.path.join(directory, f"sintetico_{name}_{pages}p.pdf")
+        generate_synthetic_pdf(path, pages, seed=seed, **CORPUS_PROFILES[name])
+        corpus[name] = path
+    return corpus
+
+
+def _peak_rss_mb():
+    """Pico de memória do processo atual em MB, ou None sem o módulo resource (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB e macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def stage_open(pdf_path):
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as pdf_document:
+        return pdf_document.page_count
+
+
+def stage_boxes(pdf_path):
+    import fitz  # PyMuPDF
+    from nucleo_analise import describe_format, pymupdf_page_boxes
+
+    log = lambda message, level="INFO": None
+    with fitz.open(pdf_path) as pdf_document:
+        for page in pdf_document:
+            boxes = pymupdf_page_boxes(page, page.number, log=log)
+            describe_format(boxes['MediaBox'])
+        return pdf_document.page_count
+
+
+def stage_color(pdf_path):
+    import fitz  # PyMuPDF
+    from nucleo_analise import detect_color_mode
+
+    log = lambda message, level="INFO": None
+    with fitz.open(pdf_path) as pdf_document:
+        for page_index in range(pdf_document.page_count):
+            detect_color_mode(pdf_document, page_index, log=log)
+        return pdf_document.page_count
+
+
+def stage_thumbnails(pdf_path):
+    """Rasterização das miniaturas, na mesma escala da faixa de miniaturas"""
+    import fitz  # PyMuPDF
+
+    width, height = THUMBNAIL_SIZE
+    with fitz.open(pdf_path) as pdf_document:
+        for page in pdf_document:
+            zoom = min(width / page.rect.width, height / page.rect.height)
+            page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        return pdf_document.page_count
+
+
+def stage_preview(pdf_path):
+    """Rasterização da visualização de página única, em blocos e na escala da interface"""
+    import fitz  # PyMuPDF
+    from renderizacao_blocos import preview_zoom, render_tiles
+
+    with fitz.open(pdf_path) as pdf_document:
+        for page in pdf_document:
+            zoom = preview_zoom(page.rect, PREVIEW_ZOOM)
+            for _ in render_tiles(page.get_displaylist(), fitz.Matrix(zoom, zoom)):
+                pass
+        return pdf_document.page_count
+
+
+def stage_analysis(pdf_path):
+    """Análise completa (boxes, formato e cor) em um único processo"""
+    from nucleo_analise import iter_page_results
+
+    log = lambda message, level="INFO": None
+    return sum(1 for _ in iter_page_results(pdf_path, log=log))
+
+
+def stage_quick_verdict(pdf_path):
+    from veredito_rapido import quick_verdict
+
+    return quick_verdict(pdf_path).num_pages
+
+
+STAGES = {
+    'abertura': stage_open,
+    'boxes': stage_boxes,
+    'cor': stage_color,
+    'miniaturas': stage_thumbnails,
+    'visualizacao': stage_preview,
+    'analise': stage_analysis,
+    'veredito_rapido': stage_quick_verdict,
+}
+
+
+def _run_stage(stage, pdf_path, repeat):
+    """
+    Executa a etapa repeat vezes no processo atual. Retorna o melhor tempo,
+    as páginas processadas, a memória antes da etapa e o pico de memória.
+    """
+    # Importações fora da medição: só o trabalho da etapa é cronometrado
+    import fitz  # noqa: F401 (PyMuPDF)
+    import numpy  # noqa: F401
+    import formatos_papel  # noqa: F401
+    import nucleo_analise  # noqa: F401
+    import veredito_rapido  # noqa: F401
+    import cores_conteudo  # noqa: F401
+
+    baseline_rss_mb = _peak_rss_mb()
+    function = STAGES[stage]
+    best = None
+    pages = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = function(pdf_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, pages, baseline_rss_mb, _peak_rss_mb()
+
+
+def run_benchmark(corpus, stages=None, repeat=3, log=print):
+    """
+    Mede cada etapa em cada PDF do corpus ({nome: caminho}) e retorna uma
+    lista de registros com tempo, páginas por segundo e pico de memória
+    """
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for name, pdf_path in corpus.items():
+        for stage in stages or STAGES:
+            # Um processo novo por etapa: o pico de memória não inclui as anteriores
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                seconds, pages, baseline_rss_mb, peak_rss_mb = executor.submit(
+                    _run_stage, stage, pdf_path, repeat).result()
+            record = {
+                'corpus': name,
+                'stage': stage,
+                'pages': pages,
+                'seconds': seconds,
+                'pages_per_second': pages / seconds if seconds else None,
+                'peak_rss_mb': peak_rss_mb,
+                # Memória usada pela etapa, descontado o interpretador e as bibliotecas
+                'stage_rss_mb': None if peak_rss_mb is None else peak_rss_mb - baseline_rss_mb,
+            }
+            results.append(record)
+            log(format_record(record))
+    return results
+
+
+def format_record(record, baseline=None):
+    rate = record['pages_per_second']
+    peak, stage_rss = record['peak_rss_mb'], record['stage_rss_mb']
+    memory = "-" if peak is None else f"{peak:.0f} MB (+{stage_rss:.0f})"
+    line = (f"{record['corpus']:<10} {record['stage']:<16} {record['pages']:>6} pág. "
+            f"{record['seconds']:>9.3f}s {rate or 0:>10.1f} pág/s {memory:>14}")
+    if baseline and baseline.get('pages_per_second') and rate:
+        change = rate / baseline['pages_per_second'] - 1
+        marker = " <<" if change < -REGRESSION_TOLERANCE else ""
+        line += f" {change:+7.1%}{marker}"
+    return line
+
+
+def check_ink_coverage(log=print):
+    """
+    Verificação de regressão: texto e áreas em preto RGB (0 0 0 rg, como
+    gerados pelo PyMuPDF e pela maioria dos exportadores) devem ser medidos
+    só em K, sem C, M e Y. Retorna a quantidade de falhas.
+    """
+    import fitz  # PyMuPDF
+    from cobertura_tinta import measure_ink_coverage
+
+    failures = 0
+    with fitz.open() as pdf_document:
+        page = pdf_document.new_page()
+        page.insert_text((72, 144), "Preto RGB " * 4, fontsize=36, color=(0, 0, 0))
+        page.draw_rect(fitz.Rect(72, 300, 300, 500), color=None, fill=(0, 0, 0))
+        coverage = measure_ink_coverage(page)
+        if coverage.cyan or coverage.magenta or coverage.yellow or coverage.tac_max > 1:
+            failures += 1
+            log(f"FALHA: preto RGB medido com tinta colorida: {coverage.describe()}")
+        else:
+            log(f"ok: preto RGB medido só em K ({coverage.describe()})")
+    return failures
+
+
+def compare(results, baseline_results, log=print):
+    """
+    Mostra a variação de páginas por segundo em relação a um resultado
+    anterior. Retorna a quantidade de etapas mais lentas que a tolerância.
+    """
+    baseline = {(record['corpus'], record['stage']): record for record in baseline_results}
+    regressions = 0
+    log("Comparação com o resultado anterior (variação de páginas por segundo):")
+    for record in results:
+        previous = baseline.get((record['corpus'], record['stage']))
+        log(format_record(record, previous))
+        if previous and previous.get('pages_per_second') and record['pages_per_second']:
+            if record['pages_per_second'] / previous['pages_per_second'] - 1 < -REGRESSION_TOLERANCE:
+                regressions += 1
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mede o desempenho das etapas da análise em PDFs sintéticos")
+    parser.add_argument('--pages', type=int, default=100,
+                        help="Páginas de cada PDF do corpus (padrão: %(default)s)")
+    parser.add_argument('--profiles', nargs='+', choices=list(CORPUS_PROFILES), default=None,
+                        help="Perfis do corpus (padrão: todos)")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=None,
+                        help="Etapas medidas (padrão: todas)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Repetições de cada etapa; vale o melhor tempo (padrão: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="Semente do gerador do corpus")
+    parser.add_argument('--corpus-dir',
+                        help="Diretório do corpus (padrão: temporário, apagado no fim)")
+    parser.add_argument('-o', '--output', help="Arquivo JSON com os resultados")
+    parser.add_argument('--compare', help="Resultado JSON anterior para comparação")
+    parser.add_argument('--check', action='store_true',
+                        help="Apenas as verificações de regressão dos resultados (ex.: cobertura de tinta)")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 1 if check_ink_coverage() else 0
+
+    directory = args.corpus_dir or tempfile.mkdtemp(prefix="benchmark_pdf_")
+    try:
+        print(f"Gerando o corpus em {directory}...")
+        corpus = generate_corpus(directory, args.pages, args.profiles, args.seed)
+        results = run_benchmark(corpus, args.stages, max(1, args.repeat))
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'pages': args.pages, 'seed': args.seed, 'results': results}, file,
+                      ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file)['results'])
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
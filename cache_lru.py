@@ -0,0 +1,51 @@
+"""Cache LRU com orçamento de memória em bytes"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Guarda valores até somar max_bytes, descartando os usados há mais tempo.
+    O tamanho de cada valor é informado por quem o insere.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()  # Chave -> (valor, tamanho em bytes)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= self._items.pop(key)[1]
+
+            # Um item maior que o orçamento inteiro não é guardado
+            if size > self.max_bytes:
+                return
+
+            self._items[key] = (value, size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,153 @@
+"""Cache persistente (SQLite) dos resultados de análise, por conteúdo do arquivo"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from cobertura_tinta import InkCoverage
+from formatos_papel import DEFAULT_REGISTRY
+from nucleo_analise import ANALYZER_VERSION, ColorSettings, PageResult
+
+# Arquivo padrão do cache, ao lado do arquivo de configuração
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".pdf_analyzer_cache.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    content_hash TEXT NOT NULL,
+    analyzer_version TEXT NOT NULL,
+    num_pages INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (content_hash, analyzer_version)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    content_hash TEXT NOT NULL,
+    analyzer_version TEXT NOT NULL,
+    page_index INTEGER NOT NULL,
+    color_mode TEXT NOT NULL,
+    format_info TEXT NOT NULL,
+    boxes TEXT NOT NULL,
+    color_fraction REAL,
+    ink_coverage TEXT,
+    PRIMARY KEY (content_hash, analyzer_version, page_index)
+);
+"""
+
+
+def content_hash(pdf_path, chunk_size=1024 * 1024):
+    """SHA-256 do conteúdo do arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Guarda boxes, formato e modo de cor de cada página, indexados pelo hash do
+    conteúdo, pela versão do analisador, pelos parâmetros da detecção de cor e
+    pelos formatos de papel registrados. Resultados de outras versões são
+    descartados ao abrir o cache. Cada operação usa sua própria conexão, para
+    que o cache possa ser usado de threads e processos diferentes.
+    """
+
+    def __init__(self, db_path=None, color_settings=None, paper_formats=None):
+        self.db_path = db_path or DEFAULT_CACHE_FILE
+        self.version = (f"{ANALYZER_VERSION}/{(color_settings or ColorSettings()).cache_key()}"
+                        f"/{(paper_formats or DEFAULT_REGISTRY).cache_key()}")
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # Bancos criados antes das colunas color_fraction e ink_coverage
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+            if 'color_fraction' not in columns:
+                conn.execute("ALTER TABLE pages ADD COLUMN color_fraction REAL")
+            if 'ink_coverage' not in columns:
+                conn.execute("ALTER TABLE pages ADD COLUMN ink_coverage TEXT")
+            current = f"{ANALYZER_VERSION}/%"
+            conn.execute("DELETE FROM documents WHERE analyzer_version NOT LIKE ?", (current,))
+            conn.execute("DELETE FROM pages WHERE analyzer_version NOT LIKE ?", (current,))
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão, confirma a transação ao final e fecha a conexão"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def file_hash(self, pdf_path):
+        """
+        Hash do conteúdo do arquivo. Se tamanho e data de modificação não
+        mudaram desde a última vez, o hash salvo é reutilizado sem reler o arquivo.
+        """
+        path = os.path.abspath(pdf_path)
+        stat = os.stat(path)
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT size, mtime_ns, content_hash FROM files WHERE path = ?",
+                               (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = content_hash(path)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                         (path, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def load(self, digest):
+        """Retorna a lista de PageResult salva para o hash, ou None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT num_pages FROM documents WHERE content_hash = ? AND analyzer_version = ?",
+                               (digest, self.version)).fetchone()
+            if row is None:
+                return None
+
+            pages = []
+            for page_index, color_mode, format_info, boxes, color_fraction, ink_coverage in conn.execute(
+                    "SELECT page_index, color_mode, format_info, boxes, color_fraction, ink_coverage FROM pages "
+                    "WHERE content_hash = ? AND analyzer_version = ? ORDER BY page_index",
+                    (digest, self.version)):
+                boxes = json.loads(boxes)
+                for box in boxes.values():
+                    box['raw'] = tuple(box['raw'])
+                if ink_coverage is not None:
+                    ink_coverage = InkCoverage.from_dict(json.loads(ink_coverage))
+                pages.append(PageResult(page_index, boxes, color_mode, format_info, color_fraction,
+                                        ink_coverage))
+
+            # Resultado incompleto (ex.: gravação interrompida) é tratado como ausente
+            if len(pages) != row[0]:
+                return None
+            return pages
+
+    def store(self, digest, pages):
+        """Salva os resultados de todas as páginas do documento"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages WHERE content_hash = ? AND analyzer_version = ?",
+                         (digest, self.version))
+            conn.executemany("INSERT INTO pages (content_hash, analyzer_version, page_index, color_mode, "
+                             "format_info, boxes, color_fraction, ink_coverage) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(digest, self.version, page.page_index, page.color_mode,
+                               page.format_info, json.dumps(page.boxes), page.color_fraction,
+                               json.dumps(page.ink_coverage.to_dict()) if page.ink_coverage else None)
+                              for page in pages])
+            conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                         (digest, self.version, len(pages), time.time()))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages")
+            conn.execute("DELETE FROM documents")
+            conn.execute("DELETE FROM files")
@@ -0,0 +1,114 @@
+"""
+Cobertura de tinta por separação (C, M, Y, K) e cobertura total de tinta (TAC).
+
+A página é renderizada em CMYK pelo PyMuPDF em blocos (renderizacao_blocos),
+a partir de uma display list: a memória usada não depende do tamanho da
+página e o conteúdo é interpretado uma única vez. Cada bloco é reduzido com o
+NumPy (soma por canal, TAC máximo e área acima do limite) e descartado antes
+do próximo.
+
+Por padrão o MuPDF converte RGB para CMYK pelos perfis ICC, que transformam o
+preto RGB (0 0 0 rg, o do texto da maioria dos exportadores) em um preto de
+quatro cores com TAC perto de 300%. A medição desliga o ICC durante a
+renderização e usa a conversão simples do MuPDF: cinzas RGB viram só K,
+como cinzas em DeviceGray, e cores definidas em CMYK no PDF são mantidas.
+"""
+import contextlib
+from dataclasses import dataclass
+
+import instrumentacao
+from renderizacao_blocos import PageRenderer, pixmap_array
+
+# Resolução da renderização em CMYK (cada pixel cobre cerca de 0,35 mm)
+INK_DPI = 72
+
+# Cobertura total máxima aceita pela gráfica (3.0 = 300%)
+TAC_LIMIT = 3.0
+
+
+@dataclass(frozen=True)
+class InkCoverage:
+    """
+    Cobertura média de cada separação (0 a 1), TAC máximo de um pixel (0 a 4,
+    ou seja, 0% a 400%) e fração da área acima do limite de TAC
+    """
+    cyan: float
+    magenta: float
+    yellow: float
+    black: float
+    tac_max: float
+    tac_over_limit: float
+
+    @property
+    def total(self):
+        """Cobertura média total (soma das quatro separações)"""
+        return self.cyan + self.magenta + self.yellow + self.black
+
+    def as_tuple(self):
+        return (self.cyan, self.magenta, self.yellow, self.black, self.tac_max, self.tac_over_limit)
+
+    def to_dict(self):
+        return {'cyan': self.cyan, 'magenta': self.magenta, 'yellow': self.yellow, 'black': self.black,
+                'tac_max': self.tac_max, 'tac_over_limit': self.tac_over_limit}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['cyan'], data['magenta'], data['yellow'], data['black'],
+                   data['tac_max'], data['tac_over_limit'])
+
+    def describe(self):
+        return (f"C {self.cyan * 100:.1f}% M {self.magenta * 100:.1f}% "
+                f"Y {self.yellow * 100:.1f}% K {self.black * 100:.1f}%, TAC máx {self.tac_max * 100:.0f}%")
+
+
+@contextlib.contextmanager
+def simple_color_conversion():
+    """
+    Desliga a gestão de cor ICC do MuPDF (global) e a religa no fim, o
+    padrão do PyMuPDF. Quem chama deve impedir renderizações simultâneas de
+    outras threads (ex.: com o lock da DocumentSession).
+    """
+    import fitz  # PyMuPDF
+
+    fitz.TOOLS.set_icc(False)
+    try:
+        yield
+    finally:
+        fitz.TOOLS.set_icc(True)
+
+
+def measure_ink_coverage(page, dpi=INK_DPI, tac_limit=TAC_LIMIT, renderer=None):
+    """
+    Mede a cobertura de tinta de uma página do PyMuPDF e retorna um
+    InkCoverage. Com um PageRenderer, a display list dele é reaproveitada.
+    """
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    renderer = renderer or PageRenderer(page)
+    if renderer.rect.is_empty:
+        return InkCoverage(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+    zoom = dpi / 72
+    # TAC em unidades da soma dos quatro canais (0 a 4 x 255)
+    limit = tac_limit * 255
+
+    sums = np.zeros(4, dtype=np.uint64)
+    pixels = 0
+    tac_max = 0
+    over_limit = 0
+    # Os blocos são renderizados durante a iteração, então o ICC fica desligado no laço inteiro
+    with simple_color_conversion():
+        for _, _, pix in renderer.tiles(fitz.Matrix(zoom, zoom), colorspace=fitz.csCMYK):
+            with instrumentacao.stage('cobertura_tinta'):
+                tile = pixmap_array(pix)[:, :, :4]
+                sums += tile.sum(axis=(0, 1), dtype=np.uint64)
+                tac = tile.sum(axis=2, dtype=np.uint16)
+                tac_max = max(tac_max, int(tac.max()))
+                over_limit += int(np.count_nonzero(tac > limit))
+                pixels += pix.width * pix.height
+
+    if not pixels:
+        return InkCoverage(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    cyan, magenta, yellow, black = (float(total) / (255 * pixels) for total in sums)
+    return InkCoverage(cyan, magenta, yellow, black, tac_max / 255, over_limit / pixels)
@@ -0,0 +1,332 @@
+"""
+Detecção de cor pelo conteúdo da página, sem renderizar.
+
+O content stream é percorrido acompanhando as cores de preenchimento e de
+traço (rg, k, g, cs/scn...) e o que é pintado com elas (traçados, texto,
+imagens e forms); os espaços de cor dos recursos e as imagens usadas pela
+página também são inspecionados. Quando o conteúdo não permite uma conclusão
+segura (degradês, padrões, imagens RGB, anotações...), o resultado é None e a
+página deve ser renderizada.
+"""
+import re
+
+# Delimitadores de tokens em um content stream
+_DELIMITERS = rb'\s\[\]()<>{}/%'
+_NUMBER = rb'[-+]?(?:\d+\.?\d*|\.\d+)'
+
+# Operadores de cor e de estado gráfico, de pintura (traçados, texto, sh, Do) e
+# BI (imagem inline). Um operador não pode vir logo depois de "/" (seria um nome).
+_OPERATORS = (rb"rg|RG|k|K|g|G|cs|CS|scn|SCN|sc|SC|q|Q|Tr|"
+              rb"f\*|f|F|S|s|B\*|B|b\*|b|Tj|TJ|'|\"|sh|Do|BI")
+
+# Comentários e strings são percorridos à parte: podem conter qualquer texto, inclusive "rg"
+_TOKEN_RE = re.compile(
+    rb'(?P<comment>%[^\r\n]*)'
+    rb'|(?P<string>\()'
+    rb'|(?P<hex><[0-9A-Fa-f\s]*>)'
+    rb'|(?<![^\s\[\]()<>{}%])(?P<op>' + _OPERATORS + rb')(?![^' + _DELIMITERS + rb'])')
+
+# Caracteres que delimitam strings literais, com parênteses aninhados
+_STRING_CHAR_RE = re.compile(rb'[\\()]')
+
+# Os operandos ficam nos tokens imediatamente anteriores ao operador
+_OPERANDS_WINDOW = 96
+_NUMBER_RE = re.compile(_NUMBER + rb'$')
+
+# Operadores que definem a cor em um espaço de cor do dispositivo
+_DEVICE_COLOR_OPERATORS = {'g': 'gray', 'G': 'gray', 'rg': 'rgb', 'RG': 'rgb', 'k': 'cmyk', 'K': 'cmyk'}
+_COMPONENTS = {'gray': 1, 'rgb': 3, 'cmyk': 4}
+
+# Operadores que definem a cor de preenchimento (os demais, a de traço)
+_FILL_COLOR_OPERATORS = {'g', 'rg', 'k', 'cs', 'sc', 'scn'}
+
+# Operadores de pintura e os estados de cor que usam
+_FILL_PAINT = {'f', 'F', 'f*'}
+_STROKE_PAINT = {'S', 's'}
+_FILL_STROKE_PAINT = {'B', 'B*', 'b', 'b*'}
+_TEXT_SHOW = {'Tj', 'TJ', "'", '"'}
+
+# Operadores cujos operandos não interessam
+_NO_OPERANDS = _FILL_PAINT | _STROKE_PAINT | _FILL_STROKE_PAINT | _TEXT_SHOW | {'sh', 'q', 'Q'}
+
+# Modos de renderização de texto (Tr) que preenchem e que traçam os glifos
+_TEXT_FILL_MODES = {0, 2, 4, 6}
+_TEXT_STROKE_MODES = {1, 2, 5, 6}
+
+_DEVICE_SPACES = {
+    'DeviceGray': 'gray', 'G': 'gray', 'CalGray': 'gray',
+    'DeviceRGB': 'rgb', 'RGB': 'rgb', 'CalRGB': 'rgb',
+    'DeviceCMYK': 'cmyk', 'CMYK': 'cmyk',
+    'Pattern': 'pattern'
+}
+
+# Separações que só usam tinta preta (ou nenhuma)
+_NEUTRAL_SEPARATIONS = {'Black', 'All', 'None'}
+
+# Profundidade máxima de Form XObjects aninhados
+_MAX_DEPTH = 12
+
+COLOR, GRAY, AMBIGUOUS = "Colorido", "Preto e Branco", None
+
+
+def _is_colored_rgb(r, g, b, threshold):
+    return (max(r, g, b) - min(r, g, b)) * 255 > threshold
+
+
+def _is_colored_cmyk(c, m, y, k, threshold):
+    return _is_colored_rgb((1 - c) * (1 - k), (1 - m) * (1 - k), (1 - y) * (1 - k), threshold)
+
+
+def _is_colored(kind, values, threshold):
+    """True/False para cores em espaços conhecidos, None se não for possível decidir"""
+    if kind == 'gray' and len(values) == 1:
+        return False
+    if kind == 'rgb' and len(values) == 3:
+        return _is_colored_rgb(*values, threshold)
+    if kind == 'cmyk' and len(values) == 4:
+        return _is_colored_cmyk(*values, threshold)
+    return None
+
+
+class ContentColorInspector:
+    """Inspeciona as páginas de um documento do PyMuPDF"""
+
+    def __init__(self, pdf_document, threshold):
+        self.doc = pdf_document
+        self.threshold = threshold
+        self._forms = {}  # (xref do Form XObject, estado herdado) -> resultado
+
+    def _resolve(self, value_type, value):
+        """Converte o valor de uma chave (xref, nome ou array) em texto PDF"""
+        if value_type == 'xref':
+            return self.doc.xref_object(int(value.split()[0]), compressed=True)
+        return value
+
+    def colorspace_kind(self, value_type, value):
+        """Classifica um espaço de cor: gray, rgb, cmyk, pattern ou other"""
+        if value_type == 'null':
+            return 'other'
+        value = self._resolve(value_type, value).strip()
+
+        if value.startswith('/'):
+            return _DEVICE_SPACES.get(value[1:], 'other')
+
+        tokens = re.findall(r'/[^\s/\[\]]+|\d+ \d+ R', value)
+        if not tokens:
+            return 'other'
+        family = tokens[0][1:]
+
+        if family in ('CalGray', 'CalRGB'):
+            return _DEVICE_SPACES[family]
+        if family == 'ICCBased' and len(tokens) > 1:
+            stream_xref = int(tokens[1].split()[0])
+            components = self.doc.xref_get_key(stream_xref, 'N')[1]
+            return {'1': 'gray', '3': 'rgb', '4': 'cmyk'}.get(components, 'other')
+        if family == 'Separation' and len(tokens) > 1:
+            return 'gray' if tokens[1][1:] in _NEUTRAL_SEPARATIONS else 'other'
+        if family == 'Pattern':
+            return 'pattern'
+        return 'other'
+
+    def resources_owner(self, xref):
+        """Objeto que contém o dicionário /Resources (herdado da árvore de páginas)"""
+        for _ in range(_MAX_DEPTH):
+            if self.doc.xref_get_key(xref, 'Resources')[0] != 'null':
+                return xref
+            parent_type, parent = self.doc.xref_get_key(xref, 'Parent')
+            if parent_type != 'xref':
+                break
+            xref = int(parent.split()[0])
+        return None
+
+    def resource(self, owner, category, name):
+        if owner is None:
+            return ('null', 'null')
+        return self.doc.xref_get_key(owner, f'Resources/{category}/{name}')
+
+    def inspect_page(self, page):
+        # Anotações e fontes Type3 têm aparência própria, fora do content stream
+        if page.first_annot is not None or page.first_widget is not None:
+            return AMBIGUOUS
+        if any(font[2] == 'Type3' for font in page.get_fonts()):
+            return AMBIGUOUS
+
+        owner = self.resources_owner(page.xref)
+        return self.inspect_stream(page.read_contents(), owner, 0)
+
+    def inspect_xobject(self, owner, name, depth, state):
+        """
+        Resultado do XObject pintado com o estado gráfico state (cor de
+        preenchimento, cor de traço, modo de texto)
+        """
+        value_type, value = self.resource(owner, 'XObject', name)
+        if value_type != 'xref':
+            return AMBIGUOUS
+        xref = int(value.split()[0])
+        subtype = self.doc.xref_get_key(xref, 'Subtype')[1]
+
+        if subtype == '/Image':
+            # Máscaras de imagem são pintadas com a cor de preenchimento atual
+            if self.doc.xref_get_key(xref, 'ImageMask')[1] == 'true':
+                return _paint_result(state[0])
+            kind = self.colorspace_kind(*self.doc.xref_get_key(xref, 'ColorSpace'))
+            # Imagens RGB/CMYK podem ter conteúdo cinza; só a renderização decide
+            return GRAY if kind == 'gray' else AMBIGUOUS
+
+        if subtype == '/Form':
+            # O form herda as cores de quem o pinta
+            key = (xref,) + state
+            if key not in self._forms:
+                if depth >= _MAX_DEPTH:
+                    return AMBIGUOUS
+                form_owner = xref if self.doc.xref_get_key(xref, 'Resources')[0] != 'null' else owner
+                self._forms[key] = self.inspect_stream(self.doc.xref_stream(xref) or b'', form_owner,
+                                                       depth + 1, state)
+            return self._forms[key]
+
+        return AMBIGUOUS
+
+    def inspect_stream(self, content, owner, depth, state=(False, False, 0)):
+        """
+        Percorre o content stream acompanhando as cores de preenchimento e de
+        traço (True colorida, False cinza, None desconhecida). A página só é
+        colorida quando algo é pintado com uma cor colorida; uma cor colorida
+        definida e nunca usada deixa o resultado inconclusivo.
+        """
+        fill, stroke, text_mode = state
+        fill_kind = stroke_kind = 'gray'
+        saved = []  # Pilha do estado gráfico (q/Q)
+        ambiguous = unused_color = False
+        pos = operands_start = 0
+
+        while True:
+            match = _TOKEN_RE.search(content, pos)
+            if match is None:
+                break
+            pos = match.end()
+
+            if match.lastgroup == 'string':
+                pos = operands_start = _string_end(content, pos)
+                continue
+            if match.lastgroup != 'op':
+                operands_start = pos
+                continue
+
+            op = match.group('op').decode()
+            if op == 'BI':
+                # Os dados binários da imagem inline não podem ser analisados
+                return AMBIGUOUS
+
+            painted = None
+            if op in _FILL_PAINT:
+                painted = (fill,)
+            elif op in _STROKE_PAINT:
+                painted = (stroke,)
+            elif op in _FILL_STROKE_PAINT:
+                painted = (fill, stroke)
+            elif op in _TEXT_SHOW:
+                painted = (((fill,) if text_mode in _TEXT_FILL_MODES else ()) +
+                           ((stroke,) if text_mode in _TEXT_STROKE_MODES else ()))
+            elif op == 'sh':
+                # Degradê: as cores estão na função do shading
+                painted = (None,)
+            elif op == 'q':
+                saved.append((fill, stroke, fill_kind, stroke_kind, text_mode))
+            elif op == 'Q':
+                if saved:
+                    fill, stroke, fill_kind, stroke_kind, text_mode = saved.pop()
+
+            if op in _NO_OPERANDS:
+                operands_start = pos
+                if painted is not None:
+                    if True in painted:
+                        return COLOR
+                    ambiguous = ambiguous or None in painted
+                continue
+
+            # Operandos: números e, opcionalmente, um nome logo antes do operador
+            tokens = content[max(operands_start, match.start() - _OPERANDS_WINDOW):match.start()].split()
+            operands_start = pos
+            name = None
+            if tokens and tokens[-1].startswith(b'/'):
+                name = tokens.pop()[1:].decode('latin-1')
+            values = []
+            for token in reversed(tokens[-4:]):
+                if not _NUMBER_RE.match(token):
+                    break
+                values.insert(0, float(token))
+
+            if op == 'Tr':
+                text_mode = int(values[-1]) if values else text_mode
+                continue
+            if op == 'Do':
+                result = self.inspect_xobject(owner, name, depth, (fill, stroke, text_mode))
+                if result == COLOR:
+                    return COLOR
+                ambiguous = ambiguous or result is AMBIGUOUS
+                continue
+
+            # Operadores de cor
+            if op in ('cs', 'CS'):
+                if name in _DEVICE_SPACES:
+                    kind = _DEVICE_SPACES[name]
+                elif name:
+                    kind = self.colorspace_kind(*self.resource(owner, 'ColorSpace', name))
+                else:
+                    kind = 'other'
+                # A cor inicial dos espaços gray, rgb e cmyk é o preto
+                colored = False if kind in ('gray', 'rgb', 'cmyk') else None
+                if op in _FILL_COLOR_OPERATORS:
+                    fill_kind, fill = kind, colored
+                else:
+                    stroke_kind, stroke = kind, colored
+                continue
+
+            if op in _DEVICE_COLOR_OPERATORS:
+                kind = _DEVICE_COLOR_OPERATORS[op]
+                colored = _is_colored(kind, values[-_COMPONENTS[kind]:], self.threshold)
+            else:
+                # sc, scn, SC, SCN; um nome como operando indica um padrão (pattern)
+                kind = fill_kind if op in ('sc', 'scn') else stroke_kind
+                colored = None if name else _is_colored(kind, values, self.threshold)
+            unused_color = unused_color or colored is True
+
+            if op in _FILL_COLOR_OPERATORS:
+                fill_kind, fill = kind, colored
+            else:
+                stroke_kind, stroke = kind, colored
+
+        return AMBIGUOUS if ambiguous or unused_color else GRAY
+
+
+def _string_end(content, pos):
+    """Posição logo após a string literal aberta antes de pos, com parênteses aninhados"""
+    depth = 1
+    while depth:
+        match = _STRING_CHAR_RE.search(content, pos)
+        if match is None:
+            return len(content)
+        pos = match.end()
+        char = match.group()
+        if char == b'\\':
+            pos += 1
+        elif char == b'(':
+            depth += 1
+        else:
+            depth -= 1
+    return pos
+
+
+def _paint_result(colored):
+    """Resultado de algo pintado com uma cor colorida (True), cinza (False) ou desconhecida"""
+    if colored:
+        return COLOR
+    return GRAY if colored is False else AMBIGUOUS
+
+
+def inspect_page_colors(pdf_document, page, threshold):
+    """
+    Retorna "Colorido" ou "Preto e Branco" quando o conteúdo da página permite
+    decidir sem renderizar, ou None quando a página precisa ser renderizada
+    """
+    return ContentColorInspector(pdf_document, threshold).inspect_page(page)
@@ -0,0 +1,196 @@
+"""
+Exportação dos resultados por página em JSON Lines ou CSV.
+
+Cada página é gravada (e enviada ao disco) assim que é analisada, sem montar o
+relatório em memória: um livro de milhares de páginas usa memória constante e
+outros programas podem ler o arquivo antes do fim da análise.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+
+from formatos_papel import PaperFormatRegistry, load_custom_formats
+from nucleo_analise import BOX_TYPES, PT_TO_MM, default_log, page_orientation
+
+# Formatos aceitos, identificados pela extensão do arquivo
+REPORT_FORMATS = ('jsonl', 'csv')
+
+# Coordenadas e dimensões de cada box, exportadas em pontos e em milímetros
+_BOX_FIELDS = ('x0', 'y0', 'x1', 'y1', 'width', 'height')
+
+# Medidas de cada box nas colunas do CSV
+_BOX_MEASURES = tuple(f"{field}_{unit}" for unit in ('pt', 'mm') for field in _BOX_FIELDS) + ('source',)
+
+# Colunas da cobertura de tinta, vazias quando ela não foi medida
+INK_COLUMNS = ('ink_cyan', 'ink_magenta', 'ink_yellow', 'ink_black', 'tac_max', 'tac_over_limit')
+
+CSV_COLUMNS = (['file', 'page', 'format', 'orientation', 'color_mode', 'color_fraction', 'source'] +
+               list(INK_COLUMNS) +
+               [f"{box_type}_{measure}" for box_type in BOX_TYPES for measure in _BOX_MEASURES])
+
+
+def box_record(box):
+    """Coordenadas e dimensões de um box, todas em pontos e em milímetros"""
+    x0, y0, x1, y1 = box['raw']
+    points = dict(zip(_BOX_FIELDS, (x0, y0, x1, y1, abs(x1 - x0), abs(y1 - y0))))
+    record = {f"{field}_pt": value for field, value in points.items()}
+    record.update((f"{field}_mm", value * PT_TO_MM) for field, value in points.items())
+    record['source'] = box.get('source', 'PyPDF2')
+    return record
+
+
+def page_record(pdf_path, page_result):
+    """Registro de uma página para o relatório, com o formato determinado na análise"""
+    mediabox = page_result.boxes.get('MediaBox')
+    ink = page_result.ink_coverage.as_tuple() if page_result.ink_coverage else (None,) * len(INK_COLUMNS)
+    record = {
+        'file': pdf_path,
+        'page': page_result.page_index + 1,
+        'format': page_result.format_info or None,
+        'orientation': page_orientation(mediabox) if mediabox else None,
+        'color_mode': page_result.color_mode,
+        'color_fraction': page_result.color_fraction,
+        'source': page_result.mediabox_source,
+    }
+    record.update(zip(INK_COLUMNS, ink))
+    record['boxes'] = {box_type: box_record(box) for box_type, box in page_result.boxes.items()}
+    return record
+
+
+class ReportWriter:
+    """
+    Grava os registros das páginas em um arquivo aberto. O arquivo é
+    esvaziado para o disco a cada página.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.pages_written = 0
+
+    def write(self, pdf_path, page_result):
+        self.write_record(page_record(pdf_path, page_result))
+        self.output.flush()
+        self.pages_written += 1
+
+    def write_record(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        self.output.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonLinesReportWriter(ReportWriter):
+    """Uma linha JSON por página, com os boxes aninhados"""
+
+    def write_record(self, record):
+        self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class CsvReportWriter(ReportWriter):
+    """Uma linha por página, com uma coluna para cada medida de cada box"""
+
+    def __init__(self, output):
+        super().__init__(output)
+        self.writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS)
+        self.writer.writeheader()
+
+    def write_record(self, record):
+        row = {key: value for key, value in record.items() if key != 'boxes'}
+        for box_type, box in record['boxes'].items():
+            for measure in _BOX_MEASURES:
+                row[f"{box_type}_{measure}"] = box[measure]
+        self.writer.writerow(row)
+
+
+def detect_report_format(path, default='jsonl'):
+    """
+    Formato do relatório pela extensão do arquivo (.csv ou .jsonl/.json), ou
+    default se a extensão for outra
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.json'):
+        return 'jsonl'
+    return default
+
+
+def open_report(path, report_format=None):
+    """Cria o arquivo do relatório e retorna o ReportWriter correspondente"""
+    report_format = report_format or detect_report_format(path)
+    if report_format == 'csv':
+        return CsvReportWriter(open(path, 'w', encoding='utf-8', newline=''))
+    return JsonLinesReportWriter(open(path, 'w', encoding='utf-8'))
+
+
+def export_pages(pdf_paths, writer, workers=None, cross_check=False, color_settings=None, log=None,
+                 paper_formats=None):
+    """
+    Analisa os arquivos, um de cada vez, gravando cada página assim que ela é
+    analisada. Retorna a quantidade de arquivos com erro.
+    """
+    from analise_paralela import ParallelAnalyzer
+
+    log = log or default_log
+    failures = 0
+    engine = ParallelAnalyzer(workers=workers, cross_check=cross_check, color_settings=color_settings,
+                              paper_formats=paper_formats)
+
+    for pdf_path in pdf_paths:
+        try:
+            num_pages = engine.count_pages(pdf_path)
+            for page_result in engine.analyze(pdf_path, num_pages, log=log):
+                writer.write(pdf_path, page_result)
+        except Exception as e:
+            failures += 1
+            log(f"{pdf_path}: Erro ao analisar o PDF: {str(e)}", "ERROR")
+
+    return failures
+
+
+def main(argv=None):
+    from analise_lote import add_color_arguments, color_settings_from_args, iter_pdf_paths
+
+    parser = argparse.ArgumentParser(
+        description="Exporta os resultados de cada página dos PDFs em JSON Lines ou CSV")
+    parser.add_argument('inputs', nargs='+', help="Arquivos PDF, diretórios ou padrões glob")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Arquivo do relatório (.csv ou .jsonl)")
+    parser.add_argument('-f', '--format', choices=REPORT_FORMATS,
+                        help="Formato do relatório (padrão: pela extensão do arquivo)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Número de processos por arquivo (padrão: todos os núcleos)")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help="Percorrer subdiretórios")
+    parser.add_argument('--cross-check', action='store_true',
+                        help="Conferir os boxes também com o PyPDF2 (mais lento)")
+    parser.add_argument('--paper-formats',
+                        help='Arquivo JSON com formatos de papel próprios: {"nome": [largura, altura]} em mm')
+    add_color_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(name)s - %(levelname)s - %(message)s')
+
+    color_settings = color_settings_from_args(args)
+    paper_formats = None
+    if args.paper_formats:
+        paper_formats = PaperFormatRegistry(load_custom_formats(args.paper_formats))
+    paths = iter_pdf_paths(args.inputs, recursive=args.recursive)
+    with open_report(args.output, args.format) as writer:
+        failures = export_pages(paths, writer, args.workers, args.cross_check, color_settings,
+                                paper_formats=paper_formats)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
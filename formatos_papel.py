@@ -0,0 +1,141 @@
+"""
+Registro de formatos de papel (séries ISO A/B/C, formatos americanos e
+brasileiros) e classificação das páginas pelo formato mais próximo.
+
+Formatos próprios podem ser adicionados pelo arquivo de configuração, como um
+dicionário nome -> [largura, altura] em milímetros.
+"""
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+# Diferença máxima (em mm) entre a página e o formato, em cada dimensão
+FORMAT_TOLERANCE_MM = 5
+
+# Páginas classificadas por vez (limita a matriz páginas x formatos)
+CLASSIFY_CHUNK = 4096
+
+# Nome -> (largura, altura) em mm, em retrato
+BUILTIN_FORMATS = {
+    # ISO 216 série A
+    'A0': (841, 1189), 'A1': (594, 841), 'A2': (420, 594), 'A3': (297, 420),
+    'A4': (210, 297), 'A5': (148, 210), 'A6': (105, 148), 'A7': (74, 105),
+    'A8': (52, 74), 'A9': (37, 52), 'A10': (26, 37),
+    # ISO 216 série B
+    'B0': (1000, 1414), 'B1': (707, 1000), 'B2': (500, 707), 'B3': (353, 500),
+    'B4': (250, 353), 'B5': (176, 250), 'B6': (125, 176), 'B7': (88, 125),
+    'B8': (62, 88), 'B9': (44, 62), 'B10': (31, 44),
+    # ISO 269 série C (envelopes)
+    'C0': (917, 1297), 'C1': (648, 917), 'C2': (458, 648), 'C3': (324, 458),
+    'C4': (229, 324), 'C5': (162, 229), 'C6': (114, 162), 'C7': (81, 114),
+    'C8': (57, 81), 'C9': (40, 57), 'C10': (28, 40),
+    # Formatos americanos
+    'Carta': (216, 279), 'Ofício': (216, 356), 'Tabloide': (279, 432),
+    'Executivo': (184, 267), 'Meia Carta': (140, 216),
+    # Formatos brasileiros
+    'Ofício 2': (216, 330), 'Ofício 9': (215, 315),
+    'Folha BB': (660, 960), 'Folha AA': (760, 1120),
+}
+
+
+class PaperFormatRegistry:
+    """
+    Conjunto de formatos conhecidos. Para cada página é escolhido o formato
+    mais próximo dentro da tolerância; só os formatos com o lado menor dentro
+    da tolerância são comparados. classify() recebe as dimensões de muitas
+    páginas de uma vez (ex.: um intervalo analisado por um worker), e
+    classify_one() classifica uma única página sem o custo fixo do NumPy.
+    """
+
+    def __init__(self, custom_formats=None, tolerance=FORMAT_TOLERANCE_MM):
+        self.custom_formats = dict(custom_formats or {})
+        self.tolerance = tolerance
+
+        formats = dict(BUILTIN_FORMATS)
+        formats.update(self.custom_formats)  # Formatos próprios substituem os embutidos de mesmo nome
+        self.names = list(formats)
+
+        # Ordenados pelo lado menor, para localizar os candidatos de cada página por busca binária
+        sizes = np.array([sorted(size) for size in formats.values()], dtype=np.float64).reshape(-1, 2)
+        order = np.argsort(sizes[:, 0], kind='stable')
+        self._widths, self._heights = sizes[order, 0], sizes[order, 1]
+        self._names = np.array(self.names, dtype=object)[order]
+        # Cópias em listas para classify_one()
+        self._width_list = self._widths.tolist()
+        self._height_list = self._heights.tolist()
+        self._name_list = self._names.tolist()
+
+    def cache_key(self):
+        """Identifica os formatos próprios no cache de resultados"""
+        if not self.custom_formats and self.tolerance == FORMAT_TOLERANCE_MM:
+            return "padrao"
+        data = json.dumps([self.custom_formats, self.tolerance], sort_keys=True)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+
+    def classify_one(self, width_mm, height_mm):
+        """Nome do formato de uma página (ou "Personalizado (L x A)")"""
+        short, long = sorted((float(width_mm), float(height_mm)))
+        first = bisect_right(self._width_list, short - self.tolerance)
+        last = bisect_left(self._width_list, short + self.tolerance)
+
+        best, best_distance = None, self.tolerance
+        for i in range(first, last):
+            distance = max(abs(short - self._width_list[i]), abs(long - self._height_list[i]))
+            if distance < best_distance:
+                best, best_distance = i, distance
+        if best is None:
+            return _custom_name(short, long)
+        return self._name_list[best]
+
+    def classify(self, widths_mm, heights_mm):
+        """Nome do formato de cada página (ou "Personalizado (L x A)")"""
+        widths_mm = np.atleast_1d(np.asarray(widths_mm, dtype=np.float64))
+        heights_mm = np.atleast_1d(np.asarray(heights_mm, dtype=np.float64))
+        # Comparar sempre em retrato
+        short = np.minimum(widths_mm, heights_mm)
+        long = np.maximum(widths_mm, heights_mm)
+
+        names = np.empty(len(short), dtype=object)
+        for start in range(0, len(short), CLASSIFY_CHUNK):
+            w = short[start:start + CLASSIFY_CHUNK]
+            h = long[start:start + CLASSIFY_CHUNK]
+
+            # Candidatos: formatos cujo lado menor está dentro da tolerância
+            first = np.searchsorted(self._widths, w - self.tolerance, side='right')
+            last = np.searchsorted(self._widths, w + self.tolerance, side='left')
+            width = int((last - first).max()) if len(w) else 0
+            if width == 0:
+                continue
+
+            candidates = first[:, None] + np.arange(width)
+            valid = candidates < last[:, None]
+            candidates = np.minimum(candidates, len(self._widths) - 1)
+            distance = np.maximum(np.abs(w[:, None] - self._widths[candidates]),
+                                  np.abs(h[:, None] - self._heights[candidates]))
+            distance[~valid] = np.inf
+
+            best = distance.argmin(axis=1)
+            rows = np.arange(len(best))
+            matched = distance[rows, best] < self.tolerance
+            names[start:start + len(best)] = np.where(matched, self._names[candidates[rows, best]], None)
+
+        # Só as páginas sem formato conhecido precisam de um nome próprio
+        for i in np.flatnonzero(names == None):  # noqa: E711 (comparação elemento a elemento)
+            names[i] = _custom_name(short[i], long[i])
+        return names.tolist()
+
+
+def _custom_name(short, long):
+    return f"Personalizado ({short:.1f}mm x {long:.1f}mm)"
+
+
+DEFAULT_REGISTRY = PaperFormatRegistry()
+
+
+def load_custom_formats(path):
+    """Lê formatos próprios de um arquivo JSON: {"nome": [largura, altura]} em mm"""
+    with open(path, 'r', encoding='utf-8') as file:
+        formats = json.load(file)
+    return {name: (float(size[0]), float(size[1])) for name, size in formats.items()}
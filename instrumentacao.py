@@ -0,0 +1,276 @@
+"""
+Medição do tempo gasto em cada etapa da análise.
+
+As etapas instrumentadas (boxes, inspeção do conteúdo, renderização,
+classificação da cor, formato...) registram sua duração no StageTimings ativo
+da thread, agregada em histogramas. Sem um StageTimings ativo, stage()
+devolve um contexto vazio e o custo é o de uma chamada de função. Como a
+ativação vale só para a thread que a fez, renderizações de outras threads
+(miniaturas, visualização) não entram nos tempos da análise.
+
+    timings = StageTimings()
+    with activated(timings):
+        ...
+    print("\\n".join(timings.summary_lines()))
+
+Etapas de outras threads que fazem parte da análise (ex.: a atualização da
+interface) são medidas explicitamente com measure(timings, nome).
+
+Os processos workers da análise paralela gravam em um StageTimings próprio e
+devolvem snapshot(), que é somado com merge().
+"""
+import bisect
+import contextlib
+import heapq
+import io
+import json
+import threading
+import time
+
+# Limites superiores das faixas dos histogramas, em milissegundos
+HISTOGRAM_BOUNDS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Quantidade de páginas mais lentas guardadas, com o tempo de cada etapa
+SLOWEST_PAGES = 10
+
+# Páginas mais lentas que isso são destacadas no log, em segundos
+SLOW_PAGE_SECONDS = 2.0
+
+# Etapa que mede a página inteira
+PAGE_STAGE = 'pagina'
+
+_NULL_TIMER = contextlib.nullcontext()
+_active = threading.local()  # StageTimings ativo em cada thread
+_current_page = threading.local()  # Tempos por etapa da página em andamento nesta thread
+
+
+class StageHistogram:
+    """Quantidade, total, mínimo, máximo e histograma das durações de uma etapa"""
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.minimum = seconds if self.minimum is None else min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, seconds * 1000)] += 1
+
+    def merge(self, data):
+        if not data['count']:
+            return
+        self.count += data['count']
+        self.total += data['total']
+        self.minimum = data['min'] if self.minimum is None else min(self.minimum, data['min'])
+        self.maximum = max(self.maximum, data['max'])
+        for i, count in enumerate(data['buckets']):
+            self.buckets[i] += count
+
+    def percentile(self, fraction):
+        """Limite superior (em segundos) da faixa que contém o percentil"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return HISTOGRAM_BOUNDS_MS[i] / 1000 if i < len(HISTOGRAM_BOUNDS_MS) else self.maximum
+        return self.maximum
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.minimum,
+            'max': self.maximum,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'buckets': list(self.buckets),
+        }
+
+
+class StageTimings:
+    """Tempos agregados por etapa e as páginas mais lentas"""
+
+    def __init__(self, slowest_pages=SLOWEST_PAGES):
+        self._lock = threading.Lock()
+        self.stages = {}  # Nome da etapa -> StageHistogram
+        self.slowest_pages = slowest_pages
+        self._slowest = []  # Heap de (segundos, página, tempos por etapa)
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = StageHistogram()
+            histogram.add(seconds)
+
+    def record_page(self, page_index, seconds, stages):
+        self.record(PAGE_STAGE, seconds)
+        with self._lock:
+            entry = (seconds, page_index, stages)
+            if len(self._slowest) < self.slowest_pages:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        """Páginas mais lentas: lista de (página, segundos, {etapa: segundos}), da mais lenta"""
+        with self._lock:
+            entries = sorted(self._slowest, key=lambda entry: entry[0], reverse=True)
+        return [(page_index, seconds, stages) for seconds, page_index, stages in entries]
+
+    def snapshot(self):
+        """Dicionário serializável em JSON (e entre processos)"""
+        with self._lock:
+            stages = {name: histogram.to_dict() for name, histogram in self.stages.items()}
+        return {
+            'histogram_bounds_ms': list(HISTOGRAM_BOUNDS_MS),
+            'stages': stages,
+            'slowest_pages': [{'page': page_index + 1, 'seconds': seconds, 'stages': page_stages}
+                              for page_index, seconds, page_stages in self.slowest()],
+        }
+
+    def merge(self, snapshot):
+        """Soma um snapshot() (ex.: de um processo worker)"""
+        with self._lock:
+            for name, data in snapshot['stages'].items():
+                histogram = self.stages.get(name)
+                if histogram is None:
+                    histogram = self.stages[name] = StageHistogram()
+                histogram.merge(data)
+        for page in snapshot['slowest_pages']:
+            with self._lock:
+                entry = (page['seconds'], page['page'] - 1, page['stages'])
+                if len(self._slowest) < self.slowest_pages:
+                    heapq.heappush(self._slowest, entry)
+                elif entry[0] > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+
+    def summary_lines(self):
+        """Resumo legível: uma linha por etapa e as páginas mais lentas"""
+        lines = []
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1].total, reverse=True)
+        for name, histogram in stages:
+            lines.append(f"{name}: {histogram.count} x, total {histogram.total:.3f}s, "
+                         f"média {histogram.total / histogram.count * 1000:.2f}ms, "
+                         f"p95 ≤ {histogram.percentile(0.95) * 1000:.1f}ms, "
+                         f"máx {histogram.maximum * 1000:.1f}ms")
+        slowest = self.slowest()
+        if slowest:
+            lines.append("Páginas mais lentas:")
+            for page_index, seconds, page_stages in slowest:
+                lines.append(f"  Página {page_index+1}: {seconds * 1000:.1f}ms ({describe_stages(page_stages)})")
+        return lines
+
+    def save_json(self, path, **extra):
+        data = dict(extra, **self.snapshot())
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def describe_stages(page_stages):
+    """Tempos por etapa de uma página, da etapa mais demorada para a mais rápida"""
+    items = sorted(page_stages.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in items) or "sem etapas"
+
+
+class _StageTimer:
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        self.timings.record(self.name, seconds)
+        page_stages = getattr(_current_page, 'stages', None)
+        if page_stages is not None:
+            page_stages[self.name] = page_stages.get(self.name, 0.0) + seconds
+
+
+class _PageTimer:
+    __slots__ = ('timings', 'page_index', 'start', 'outer')
+
+    def __init__(self, timings, page_index):
+        self.timings = timings
+        self.page_index = page_index
+
+    def __enter__(self):
+        self.outer = getattr(_current_page, 'stages', None)
+        _current_page.stages = {}
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        stages = _current_page.stages
+        _current_page.stages = self.outer
+        self.timings.record_page(self.page_index, seconds, stages)
+
+
+def activate(timings):
+    """
+    Passa a registrar os tempos desta thread em timings (None desativa). Prefira
+    activated(), que restaura a ativação anterior no fim.
+    """
+    _active.timings = timings
+
+
+def active():
+    return getattr(_active, 'timings', None)
+
+
+@contextlib.contextmanager
+def activated(timings):
+    """Contexto que registra os tempos desta thread em timings e depois restaura o anterior"""
+    previous = active()
+    activate(timings)
+    try:
+        yield timings
+    finally:
+        activate(previous)
+
+
+def stage(name):
+    """Contexto que mede uma etapa; não faz nada sem um StageTimings ativo"""
+    timings = active()
+    if timings is None:
+        return _NULL_TIMER
+    return _StageTimer(timings, name)
+
+
+def measure(timings, name):
+    """Contexto que mede uma etapa diretamente em timings (se não for None), em qualquer thread"""
+    if timings is None:
+        return _NULL_TIMER
+    return _StageTimer(timings, name)
+
+
+def page(page_index):
+    """Contexto que mede a página inteira e as etapas dentro dela"""
+    timings = active()
+    if timings is None:
+        return _NULL_TIMER
+    return _PageTimer(timings, page_index)
+
+
+def profile_report(profiler, limit=30):
+    """Funções com maior tempo acumulado em um cProfile.Profile, como texto"""
+    import pstats
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
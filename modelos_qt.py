@@ -0,0 +1,276 @@
+"""Modelos e workers Qt usados pela interface do analisador"""
+import os
+import threading
+from collections import OrderedDict
+from PyQt5.QtCore import (Qt, QAbstractListModel, QAbstractTableModel, QModelIndex, QSize,
+                          QThread, pyqtSignal)
+from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap
+import fitz  # PyMuPDF
+
+from renderizacao_blocos import PREVIEW_MAX_PIXELS, preview_zoom, render_bbox
+from sessao_documentos import DocumentSession
+
+# Quantidade máxima de miniaturas aguardando renderização
+MAX_PENDING_THUMBNAILS = 64
+
+
+# Formato do QImage para a quantidade de canais do pixmap do PyMuPDF
+_QIMAGE_FORMATS = {1: QImage.Format_Grayscale8, 3: QImage.Format_RGB888}
+
+
+def pixmap_image(pix):
+    """
+    QImage sobre as amostras do pixmap do PyMuPDF, sem cópia. Só é válido
+    enquanto o pixmap existir: para guardar a imagem, use uma cópia ou
+    convertToFormat().
+    """
+    return QImage(pix.samples_mv, pix.width, pix.height, pix.stride, _QIMAGE_FORMATS[pix.n])
+
+
+def render_page_image(renderer, zoom, rotation=0, max_pixels=PREVIEW_MAX_PIXELS):
+    """
+    Renderiza a página de um PageRenderer como QImage, montada a partir de
+    blocos renderizados um de cada vez. Páginas que passariam de max_pixels
+    pixels são renderizadas em escala menor, então a memória usada é limitada
+    para qualquer página.
+    Os blocos são desenhados direto das amostras do PyMuPDF em uma imagem
+    RGB32, o formato do QPixmap, que assim não precisa ser convertida.
+    """
+    zoom = preview_zoom(renderer.rect, zoom, max_pixels)
+    matrix = fitz.Matrix(zoom, zoom).prerotate(rotation)
+    bbox = render_bbox(renderer.rect, matrix)
+
+    image = QImage(bbox.width, bbox.height, QImage.Format_RGB32)
+    image.fill(Qt.white)
+    painter = QPainter(image)
+    try:
+        for x, y, pix in renderer.tiles(matrix):
+            painter.drawImage(x, y, pixmap_image(pix))
+    finally:
+        painter.end()
+    return image
+
+
+class PageResultsModel(QAbstractTableModel):
+    """
+    Resultados das páginas analisadas (em um PageResultStore), com uma linha
+    por página. As páginas chegam em lotes e cada lote é inserido de uma vez
+    (um único beginInsertRows), em vez de uma linha por vez.
+
+    As colunas Página, Modo de Cor e Área colorida formam a tabela de cores;
+    a coluna DESCRIPTION_COLUMN é o texto da lista de páginas. As colunas a
+    partir de INK_COLUMNS mostram a cobertura de tinta, quando medida.
+    """
+    HEADERS = ['Página', 'Modo de Cor', 'Área colorida', 'Descrição',
+               'Tinta C', 'Tinta M', 'Tinta Y', 'Tinta K', 'TAC máx', 'Acima do TAC']
+    DESCRIPTION_COLUMN = 3
+    INK_COLUMNS = 4
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+    def append_results(self, page_results):
+        if not page_results:
+            return
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(page_results) - 1)
+        self.store.extend(page_results)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid() or index.row() >= len(self.store):
+            return None
+        row = index.row()
+        page_number = self.store.page_index(row) + 1
+        column = index.column()
+
+        if column == 0:
+            return f"Página {page_number}"
+        color_mode = self.store.color_mode(row)
+        if column == 1:
+            return color_mode
+        if column == 2:
+            fraction = self.store.color_fraction(row)
+            return "-" if fraction is None else f"{fraction * 100:.2f}%"
+
+        if column >= self.INK_COLUMNS:
+            ink = self.store.ink_coverage(row)
+            if ink is None:
+                return "-"
+            return f"{ink.as_tuple()[column - self.INK_COLUMNS] * 100:.1f}%"
+
+        format_info = self.store.format_info(row)
+        if format_info:
+            color_indicator = "🟣" if color_mode == "Colorido" else "⚫"
+            return f"{color_indicator} Página {page_number}: {format_info} [{self.store.mediabox_source(row)}]"
+        return f"Página {page_number}: Formato desconhecido"
+
+
+class ThumbnailRenderer(QThread):
+    """
+    Renderiza miniaturas em segundo plano. Os pedidos mais recentes (páginas
+    que acabaram de aparecer na tela) são atendidos primeiro e os mais antigos
+    são descartados quando a fila enche.
+    """
+    thumbnail_ready = pyqtSignal(str, int, QImage)  # Caminho, página, imagem
+
+    def __init__(self, documents, parent=None):
+        super().__init__(parent)
+        self.documents = documents
+        self._pending = OrderedDict()  # (caminho, página) -> tamanho máximo
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def request(self, pdf_path, page_index, size):
+        with self._condition:
+            key = (pdf_path, page_index)
+            self._pending.pop(key, None)
+            self._pending[key] = size
+            while len(self._pending) > MAX_PENDING_THUMBNAILS:
+                self._pending.popitem(last=False)
+            self._condition.notify()
+
+    def clear(self):
+        """Descarta os pedidos pendentes (ex.: ao trocar de documento)"""
+        with self._condition:
+            self._pending.clear()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                (pdf_path, page_index), size = self._pending.popitem(last=True)
+
+            try:
+                image = self.render(pdf_path, page_index, size)
+            except Exception:
+                # Página ou arquivo inválido: a miniatura continua como placeholder
+                continue
+            self.thumbnail_ready.emit(pdf_path, page_index, image)
+
+    def render(self, pdf_path, page_index, size):
+        with self.documents.document(pdf_path):
+            # Mesma display list da análise e da visualização da página
+            renderer = self.documents.page_renderer(pdf_path, page_index)
+            # Escala para caber no tamanho da miniatura, mantendo a proporção
+            zoom = min(size.width() / renderer.rect.width, size.height() / renderer.rect.height)
+            pix = renderer.pixmap(fitz.Matrix(zoom, zoom))
+
+        # A conversão copia a imagem para fora do buffer do pixmap, que será liberado,
+        # já no formato do QPixmap
+        return pixmap_image(pix).convertToFormat(QImage.Format_RGB32)
+
+
+class ThumbnailModel(QAbstractListModel):
+    """
+    Modelo com uma linha por página. A miniatura só é pedida ao renderer
+    quando a view consulta a linha, ou seja, quando ela aparece na tela;
+    as imagens ficam no cache LRU compartilhado com o preview.
+    """
+
+    def __init__(self, documents, pixmap_cache, thumbnail_size=QSize(120, 160), parent=None):
+        super().__init__(parent)
+        self.pixmap_cache = pixmap_cache
+        self.thumbnail_size = thumbnail_size
+        self.pdf_path = None
+        self.file_key = None
+        self.num_pages = 0
+        self.color_modes = []
+
+        self.placeholder = QPixmap(thumbnail_size)
+        self.placeholder.fill(QColor(230, 230, 230))
+
+        self.renderer = ThumbnailRenderer(documents)
+        self.renderer.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.renderer.start()
+
+    def set_document(self, pdf_path, num_pages):
+        self.beginResetModel()
+        self.renderer.clear()
+        self.pdf_path = pdf_path
+        self.file_key = (os.path.abspath(pdf_path), DocumentSession.file_identity(pdf_path)) if pdf_path else None
+        self.num_pages = num_pages
+        self.color_modes = []
+        self.endResetModel()
+
+    def set_color_modes(self, page_results):
+        """Atualiza as legendas das miniaturas de um lote de páginas analisadas"""
+        if not page_results:
+            return
+        last = max(page_result.page_index for page_result in page_results)
+        if last >= len(self.color_modes):
+            self.color_modes.extend([None] * (last + 1 - len(self.color_modes)))
+        for page_result in page_results:
+            self.color_modes[page_result.page_index] = page_result.color_mode
+        first = min(page_result.page_index for page_result in page_results)
+        self.dataChanged.emit(self.index(first), self.index(last), [Qt.DisplayRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.num_pages
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.num_pages:
+            return None
+        page_index = index.row()
+
+        if role == Qt.DisplayRole:
+            color_mode = self.color_modes[page_index] if page_index < len(self.color_modes) else None
+            if color_mode:
+                color_indicator = "🟣" if color_mode == "Colorido" else "⚫"
+                return f"{color_indicator} Página {page_index+1}"
+            return f"Página {page_index+1}"
+
+        if role == Qt.DecorationRole:
+            pixmap = self.pixmap_cache.get(self.cache_key(page_index))
+            if pixmap is None:
+                self.renderer.request(self.pdf_path, page_index, self.thumbnail_size)
+                return self.placeholder
+            return pixmap
+
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+
+        return None
+
+    def cache_key(self, page_index):
+        return self.file_key + (page_index, 'miniatura', self.thumbnail_size.width(), self.thumbnail_size.height())
+
+    def on_thumbnail_ready(self, pdf_path, page_index, image):
+        # Ignorar miniaturas de um documento anterior
+        if pdf_path != self.pdf_path or page_index >= self.num_pages:
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.pixmap_cache.put(self.cache_key(page_index), pixmap,
+                              pixmap.width() * pixmap.height() * pixmap.depth() // 8)
+        index = self.index(page_index)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def shutdown(self):
+        self.renderer.stop()
@@ -0,0 +1,751 @@
+"""
+Núcleo de análise de PDFs (boxes, formato e modo de cor), sem dependência do Qt.
+
+Toda a análise usa um único documento do PyMuPDF; o PyPDF2 só é aberto no modo
+de verificação cruzada dos boxes. PyMuPDF, PyPDF2 e NumPy são importados apenas
+quando uma análise é executada, para que importar este módulo seja rápido.
+"""
+import decimal
+import logging
+import math
+from dataclasses import dataclass, field
+
+import instrumentacao
+from cobertura_tinta import INK_DPI, TAC_LIMIT, measure_ink_coverage
+from renderizacao_blocos import PageRenderer, pixmap_array, render_bbox
+
+# Versão da lógica de detecção. Altere sempre que boxes, formatos ou modo de
+# cor passarem a ser calculados de outra forma, para invalidar o cache de resultados
+ANALYZER_VERSION = "6"
+
+# Fator de conversão de pontos para milímetros
+PT_TO_MM = 0.352778
+
+# Lista de possíveis boxes em um PDF
+BOX_TYPES = ['MediaBox', 'CropBox', 'BleedBox', 'TrimBox', 'ArtBox']
+
+# Diferença máxima (em pontos) aceita na verificação cruzada com o PyPDF2
+CROSS_CHECK_TOLERANCE = 0.01
+
+# Diferença mínima entre canais para que um pixel seja considerado colorido
+COLOR_THRESHOLD = 30
+
+# Linhas por faixa na busca de cor; a busca termina na primeira faixa colorida
+COLOR_TILE_ROWS = 64
+
+# Pixels da primeira renderização (grossa) da página; a resolução acompanha a
+# área da página, e não um DPI fixo
+COLOR_COARSE_PIXELS = 64 * 1024
+
+# Resolução (DPI) em que as regiões suspeitas são renderizadas novamente
+COLOR_REFINE_DPI = 72
+
+# Na renderização grossa, elementos pequenos se misturam ao fundo e perdem
+# saturação: pixels com diferença acima desta fração do threshold são suspeitos
+COLOR_SUSPECT_FACTOR = 0.25
+
+# Lado (em pixels da renderização grossa) de cada região refinada
+COLOR_REFINE_TILE = 16
+
+# Máximo de regiões refinadas por página; as demais usam a estimativa grossa
+COLOR_MAX_REFINED_TILES = 48
+
+logger = logging.getLogger("PDFAnalyzer")
+
+
+@dataclass(frozen=True)
+class ColorSettings:
+    """Parâmetros da detecção de cor (precisão x velocidade)"""
+    threshold: int = COLOR_THRESHOLD  # Diferença mínima entre canais de um pixel colorido
+    min_colored_fraction: float = 0.0  # A página é colorida se a área colorida passar desta fração
+    coarse_pixels: int = COLOR_COARSE_PIXELS
+    refine_dpi: float = COLOR_REFINE_DPI
+    ink_coverage: bool = False  # Medir a cobertura de tinta (CMYK e TAC) de cada página
+    ink_dpi: float = INK_DPI
+    tac_limit: float = TAC_LIMIT  # Limite de cobertura total (3.0 = 300%)
+
+    def cache_key(self):
+        """Identifica os parâmetros no cache de resultados"""
+        key = (f"t{self.threshold}-f{self.min_colored_fraction:g}"
+               f"-p{self.coarse_pixels}-d{self.refine_dpi:g}")
+        if self.ink_coverage:
+            key += f"-i{self.ink_dpi:g}-l{self.tac_limit:g}"
+        return key
+
+
+@dataclass
+class PageResult:
+    """Resultado da análise de uma página"""
+    page_index: int
+    boxes: dict
+    color_mode: str
+    format_info: str = ""  # Vazio quando o MediaBox não pôde ser determinado
+    color_fraction: float = None  # Fração da área com cor; None quando não foi medida
+    ink_coverage: object = None  # InkCoverage; None quando não foi medida
+
+    @property
+    def format_label(self):
+        return self.format_info or "Desconhecido"
+
+    @property
+    def mediabox_source(self):
+        mediabox = self.boxes.get('MediaBox')
+        return mediabox.get('source', 'PyPDF2') if mediabox else None
+
+    def to_dict(self):
+        return {
+            'page': self.page_index + 1,
+            'format': self.format_label,
+            'color_mode': self.color_mode,
+            'color_fraction': self.color_fraction,
+            'ink_coverage': self.ink_coverage.to_dict() if self.ink_coverage else None,
+            'boxes': self.boxes
+        }
+
+
+@dataclass
+class DocumentResult:
+    """Resultado da análise de um documento inteiro"""
+    path: str
+    num_pages: int = 0
+    pages: list = field(default_factory=list)
+    messages: list = field(default_factory=list)  # Pares (nível, mensagem)
+    error: str = None
+
+    def log(self, message, level="INFO"):
+        self.messages.append((level, message))
+
+    @property
+    def formats(self):
+        return sorted(set(page.format_label for page in self.pages))
+
+    @property
+    def color_modes(self):
+        return [page.color_mode for page in self.pages]
+
+    @property
+    def mixed_formats(self):
+        return has_mixed_formats(page.format_label for page in self.pages)
+
+    @property
+    def mixed_colors(self):
+        return has_mixed_colors(self.color_modes)
+
+    def to_dict(self):
+        color_modes = self.color_modes
+        return {
+            'file': self.path,
+            'pages': self.num_pages,
+            'formats': self.formats,
+            'mixed_formats': self.mixed_formats,
+            'mixed_colors': self.mixed_colors,
+            'color_pages': color_modes.count("Colorido"),
+            'bw_pages': color_modes.count("Preto e Branco"),
+            'page_results': [page.to_dict() for page in self.pages],
+            'log': [{'level': level, 'message': message} for level, message in self.messages],
+            'error': self.error
+        }
+
+
+def has_mixed_formats(page_formats):
+    """Indica se o documento contém páginas com formatos diferentes"""
+    return len(set(page_formats)) > 1
+
+
+def has_mixed_colors(color_modes):
+    """Indica se há páginas coloridas e preto e branco misturadas"""
+    color_modes = set(color_modes)
+    return "Colorido" in color_modes and "Preto e Branco" in color_modes
+
+
+def default_log(message, level="INFO"):
+    """Envia a mensagem para o logger do sistema"""
+    if level == "ERROR":
+        logger.error(message)
+    elif level == "WARNING":
+        logger.warning(message)
+    else:
+        logger.info(message)
+
+
+def analyze_page_boxes(page, page_index, log=None):
+    """
+    Lê os boxes de uma página do PyPDF2 e converte as medidas para milímetros
+    """
+    log = log or default_log
+    page_info = {}
+
+    for box_type in BOX_TYPES:
+        try:
+            # Verificar se este tipo de box existe na página
+            if hasattr(page, box_type.lower()):
+                box = getattr(page, box_type.lower())
+                if box:
+                    # Converter todos os valores para float para evitar problemas com Decimal
+                    try:
+                        x1 = float(box[0])
+                        y1 = float(box[1])
+                        x2 = float(box[2])
+                        y2 = float(box[3])
+                    except (TypeError, ValueError) as e:
+                        # Se falhar a conversão direta, tentar ver se é Decimal
+                        if isinstance(box[0], decimal.Decimal):
+                            x1 = float(box[0])
+                            y1 = float(box[1])
+                            x2 = float(box[2])
+                            y2 = float(box[3])
+                        else:
+                            raise e
+
+                    # Converter de pontos para milímetros
+                    page_info[box_type] = box_info(x1, y1, x2, y2)
+        except Exception as e:
+            error_msg = f"Erro ao analisar {box_type} na página {page_index+1}: {str(e)}"
+            log(error_msg, "WARNING")
+
+    return page_info
+
+
+def box_info(x1, y1, x2, y2, source=None):
+    """
+    Monta o dicionário de um box a partir das coordenadas em pontos
+    """
+    info = {
+        'width': abs(x2 - x1) * PT_TO_MM,
+        'height': abs(y2 - y1) * PT_TO_MM,
+        'x': x1 * PT_TO_MM,
+        'y': y1 * PT_TO_MM,
+        'raw': (x1, y1, x2, y2)
+    }
+    if source:
+        info['source'] = source
+    return info
+
+
+def pymupdf_page_boxes(pymupdf_page, page_index, log=None):
+    """
+    Lê os cinco boxes de uma página do PyMuPDF, nas mesmas coordenadas do PDF
+    que o PyPDF2 retorna. Boxes ausentes herdam o CropBox, como no PyPDF2.
+    """
+    log = log or default_log
+    page_info = {}
+
+    try:
+        mediabox = pymupdf_page.mediabox
+        page_info['MediaBox'] = box_info(mediabox.x0, mediabox.y0, mediabox.x1, mediabox.y1, 'PyMuPDF')
+    except Exception as e:
+        log(f"Erro ao analisar MediaBox na página {page_index+1}: {str(e)}", "WARNING")
+        return page_info
+
+    for box_type in BOX_TYPES[1:]:
+        try:
+            # O PyMuPDF devolve esses boxes com o eixo y invertido em relação ao MediaBox
+            rect = getattr(pymupdf_page, box_type.lower())
+            page_info[box_type] = box_info(rect.x0, mediabox.y1 - rect.y1,
+                                           rect.x1, mediabox.y1 - rect.y0, 'PyMuPDF')
+        except Exception as e:
+            error_msg = f"Erro ao analisar {box_type} na página {page_index+1}: {str(e)}"
+            log(error_msg, "WARNING")
+
+    return page_info
+
+
+def cross_check_boxes(page_info, pypdf2_info, page_index, log=None):
+    """
+    Compara os boxes lidos pelo PyMuPDF com os do PyPDF2 e registra divergências.
+    Retorna True se todos os boxes coincidirem.
+    """
+    log = log or default_log
+    consistent = True
+
+    for box_type in BOX_TYPES:
+        box = page_info.get(box_type)
+        other = pypdf2_info.get(box_type)
+        if box is None and other is None:
+            continue
+        if box is None or other is None or any(
+                abs(a - b) > CROSS_CHECK_TOLERANCE for a, b in zip(box['raw'], other['raw'])):
+            consistent = False
+            log(f"Divergência no {box_type} da página {page_index+1}: "
+                f"PyMuPDF {box and box['raw']} x PyPDF2 {other and other['raw']}", "WARNING")
+
+    return consistent
+
+
+def pymupdf_mediabox(pymupdf_page):
+    """
+    Obtém o MediaBox a partir do tamanho da página no PyMuPDF (usado como backup)
+    """
+    rect = pymupdf_page.rect
+    return box_info(0, 0, rect.width, rect.height, 'PyMuPDF')
+
+
+def determine_paper_format(width_mm, height_mm, paper_formats=None):
+    """
+    Nome do formato mais próximo no registro (PaperFormatRegistry), ou
+    "Personalizado (L x A)" se nenhum estiver dentro da tolerância
+    """
+    from formatos_papel import DEFAULT_REGISTRY
+
+    return (paper_formats or DEFAULT_REGISTRY).classify_one(width_mm, height_mm)
+
+
+def page_orientation(mediabox):
+    """Retorna "Paisagem" ou "Retrato" a partir do MediaBox"""
+    return "Paisagem" if mediabox['width'] > mediabox['height'] else "Retrato"
+
+
+def describe_format(mediabox, paper_formats=None):
+    """
+    Retorna o formato e a orientação da página, ex.: "A4 (Retrato)"
+    """
+    formato = determine_paper_format(mediabox['width'], mediabox['height'], paper_formats)
+    return f"{formato} ({page_orientation(mediabox)})"
+
+
+def describe_page_formats(page_results, paper_formats=None):
+    """
+    Preenche o format_info de vários PageResult com uma única classificação
+    em lote (PaperFormatRegistry.classify); páginas sem MediaBox ficam vazias
+    """
+    from formatos_papel import DEFAULT_REGISTRY
+
+    pages = [page for page in page_results if page.boxes.get('MediaBox')]
+    if not pages:
+        return
+    with instrumentacao.stage('formato'):
+        mediaboxes = [page.boxes['MediaBox'] for page in pages]
+        formatos = (paper_formats or DEFAULT_REGISTRY).classify([box['width'] for box in mediaboxes],
+                                                                [box['height'] for box in mediaboxes])
+        for page, mediabox, formato in zip(pages, mediaboxes, formatos):
+            page.format_info = f"{formato} ({page_orientation(mediabox)})"
+
+
+def has_color_pixels(img_array, color_channels=3, threshold=COLOR_THRESHOLD, tile_rows=COLOR_TILE_ROWS):
+    """
+    Indica se algum pixel de uma imagem (altura x largura x canais, uint8) tem
+    diferença entre canais de cor maior que threshold.
+
+    A maior das diferenças |R-G|, |R-B| e |G-B| é max(R,G,B) - min(R,G,B), e
+    como max >= min a subtração em uint8 nunca estoura. Canais extras (alpha)
+    além de color_channels são ignorados.
+    """
+    import numpy as np
+
+    if img_array.ndim != 3 or color_channels < 3:
+        return False
+
+    channels = [img_array[:, :, c] for c in range(color_channels)]
+    for y in range(0, img_array.shape[0], tile_rows):
+        tile = [channel[y:y + tile_rows] for channel in channels]
+        highest = tile[0].copy()
+        lowest = tile[0].copy()
+        for channel in tile[1:]:
+            np.maximum(highest, channel, out=highest)
+            np.minimum(lowest, channel, out=lowest)
+        highest -= lowest
+        if (highest > threshold).any():
+            return True
+    return False
+
+
+def color_chroma(img_array, color_channels=3, tile_rows=COLOR_TILE_ROWS):
+    """
+    max(R,G,B) - min(R,G,B) de cada pixel, como matriz uint8 (altura x largura),
+    calculado em faixas para não criar cópias da imagem inteira
+    """
+    import numpy as np
+
+    chroma = np.zeros(img_array.shape[:2], dtype=np.uint8)
+    if img_array.ndim != 3 or color_channels < 3:
+        return chroma
+
+    channels = [img_array[:, :, c] for c in range(color_channels)]
+    for y in range(0, img_array.shape[0], tile_rows):
+        highest = chroma[y:y + tile_rows]
+        np.copyto(highest, channels[0][y:y + tile_rows])
+        lowest = highest.copy()
+        for channel in channels[1:]:
+            np.maximum(highest, channel[y:y + tile_rows], out=highest)
+            np.minimum(lowest, channel[y:y + tile_rows], out=lowest)
+        highest -= lowest
+    return chroma
+
+
+def _tile_chroma(pix):
+    return color_chroma(pixmap_array(pix), pix.colorspace.n if pix.colorspace else 1)
+
+
+def _render_chroma(renderer, zoom, stop_threshold=None):
+    """
+    Croma de cada pixel da página, montado a partir de blocos renderizados.
+    Com stop_threshold, retorna None assim que um bloco tiver um pixel com
+    croma maior que stop_threshold, sem renderizar o restante da página.
+    """
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    matrix = fitz.Matrix(zoom, zoom)
+    bbox = render_bbox(renderer.rect, matrix)
+    chroma = np.zeros((max(0, bbox.height), max(0, bbox.width)), dtype=np.uint8)
+    for x, y, pix in renderer.tiles(matrix):
+        with instrumentacao.stage('classificacao_cor'):
+            if stop_threshold is not None and has_color_pixels(
+                    pixmap_array(pix), pix.colorspace.n if pix.colorspace else 1, stop_threshold):
+                return None
+            tile = chroma[y:y + pix.height, x:x + pix.width]
+            tile[...] = _tile_chroma(pix)[:tile.shape[0], :tile.shape[1]]
+    return chroma
+
+
+def _colored_fraction(renderer, zoom, clip, threshold):
+    """Fração dos pixels coloridos da região clip, sem manter a renderização inteira"""
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    colored = pixels = 0
+    for _, _, pix in renderer.tiles(fitz.Matrix(zoom, zoom), clip):
+        with instrumentacao.stage('classificacao_cor'):
+            chroma = _tile_chroma(pix)
+            colored += int(np.count_nonzero(chroma > threshold))
+            pixels += chroma.size
+    return colored / pixels if pixels else None
+
+
+def sample_page_colors(page, settings=None, renderer=None, stop_at_color=False):
+    """
+    Retorna a fração da área da página ocupada por pixels coloridos. Com
+    stop_at_color, retorna None assim que a renderização grossa tiver um
+    pixel colorido, sem medir a área (basta quando qualquer cor decide).
+
+    A página é renderizada primeiro com cerca de settings.coarse_pixels pixels.
+    Os blocos da renderização grossa com pixels suspeitos são renderizados de
+    novo em settings.refine_dpi, apenas na região do bloco (clip); blocos
+    inteiramente coloridos não precisam ser refinados. O conteúdo da página é
+    interpretado uma única vez, na display list do renderer (PageRenderer),
+    que pode ser compartilhado com outras renderizações da mesma página. As
+    renderizações são feitas em blocos de no máximo TILE_PIXELS pixels, então
+    a memória usada não cresce com o tamanho da página.
+    """
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    settings = settings or ColorSettings()
+    renderer = renderer or PageRenderer(page)
+    rect = renderer.rect
+    if rect.is_empty:
+        return 0.0
+
+    refine_zoom = settings.refine_dpi / 72
+    zoom = min(math.sqrt(settings.coarse_pixels / (rect.width * rect.height)), refine_zoom)
+    chroma = _render_chroma(renderer, zoom, settings.threshold if stop_at_color else None)
+    if chroma is None:
+        return None
+    if chroma.size == 0:
+        return 0.0
+    if zoom >= refine_zoom:
+        return float((chroma > settings.threshold).mean())
+
+    with instrumentacao.stage('classificacao_cor'):
+        # Agrupar os pixels grossos em blocos tile x tile (bordas completadas com zeros)
+        tile = COLOR_REFINE_TILE
+        height, width = chroma.shape
+        rows, cols = math.ceil(height / tile), math.ceil(width / tile)
+        padded = np.zeros((rows * tile, cols * tile), dtype=np.uint8)
+        padded[:height, :width] = chroma
+        blocks = padded.reshape(rows, tile, cols, tile)
+        block_max = blocks.max(axis=(1, 3))
+        block_colored = (blocks > settings.threshold).sum(axis=(1, 3))
+        block_pixels = np.outer(np.minimum(tile, height - np.arange(rows) * tile),
+                                np.minimum(tile, width - np.arange(cols) * tile))
+
+        suspect = (block_max > settings.threshold * COLOR_SUSPECT_FACTOR) & (block_colored < block_pixels)
+        # Refinar primeiro os blocos mais saturados
+        candidates = np.argwhere(suspect)
+        order = np.argsort(-block_max[suspect], kind='stable')
+        colored_pixels = float(block_colored[~suspect].sum())
+
+    # Pixels grossos -> coordenadas da página
+    scale_x, scale_y = rect.width / width, rect.height / height
+    for n, (row, col) in enumerate(candidates[order]):
+        if n >= COLOR_MAX_REFINED_TILES:
+            colored_pixels += block_colored[row, col]
+            continue
+        clip = fitz.Rect(rect.x0 + col * tile * scale_x, rect.y0 + row * tile * scale_y,
+                         rect.x0 + min((col + 1) * tile, width) * scale_x,
+                         rect.y0 + min((row + 1) * tile, height) * scale_y)
+        fraction = _colored_fraction(renderer, refine_zoom, clip, settings.threshold)
+        if fraction is not None:
+            colored_pixels += fraction * block_pixels[row, col]
+
+    return float(colored_pixels / (height * width))
+
+
+def content_color_verdict(pdf_document, page, settings):
+    """
+    Modo de cor indicado pelo conteúdo da página, sem renderizar: "Colorido",
+    "Preto e Branco" ou None se o conteúdo for inconclusivo
+    """
+    from cores_conteudo import inspect_page_colors
+
+    try:
+        with instrumentacao.stage('cor_conteudo'):
+            return inspect_page_colors(pdf_document, page, settings.threshold)
+    except Exception:
+        # Conteúdo que não pôde ser interpretado: decidir pela renderização
+        return None
+
+
+def conclusive_color_mode(content_verdict, settings):
+    """
+    (modo, fração) quando o veredito do conteúdo basta, ou None quando a
+    página precisa ser renderizada
+    """
+    if content_verdict == "Preto e Branco":
+        return content_verdict, 0.0
+    # Pelo conteúdo não se sabe a área colorida; com uma área mínima é preciso renderizar
+    if content_verdict == "Colorido" and not settings.min_colored_fraction:
+        return content_verdict, None
+    return None
+
+
+def rendered_color_mode(page, settings, renderer=None):
+    """
+    Modo de cor e fração da área colorida pela renderização da página (a
+    fração é None quando um pixel colorido basta para decidir)
+    """
+    # Sem área mínima, o primeiro pixel colorido decide
+    fraction = sample_page_colors(page, settings, renderer, stop_at_color=not settings.min_colored_fraction)
+    if fraction is None or fraction > settings.min_colored_fraction:
+        return "Colorido", fraction
+    return "Preto e Branco", fraction
+
+
+def detect_color_mode(pdf_document, page_index, log=None, settings=None, renderer=None):
+    """
+    Detecta se uma página é colorida ou preto e branco e retorna o modo de cor
+    e a fração da área colorida. O conteúdo da página é inspecionado primeiro;
+    a página só é renderizada (pelo renderer, se informado) se ele for inconclusivo.
+    """
+    log = log or default_log
+    settings = settings or ColorSettings()
+    try:
+        page = renderer.page if renderer is not None else pdf_document[page_index]
+        result = conclusive_color_mode(content_color_verdict(pdf_document, page, settings), settings)
+        return result or rendered_color_mode(page, settings, renderer)
+
+    except Exception as e:
+        log(f"Erro ao detectar cor na página {page_index+1}: {str(e)}", "WARNING")
+        return "Desconhecido", None
+
+
+def measure_page_ink(page, page_index, settings, log=None, renderer=None):
+    """Cobertura de tinta da página (InkCoverage), ou None em caso de erro"""
+    log = log or default_log
+    try:
+        return measure_ink_coverage(page, settings.ink_dpi, settings.tac_limit, renderer)
+    except Exception as e:
+        log(f"Erro ao medir a cobertura de tinta na página {page_index+1}: {str(e)}", "WARNING")
+        return None
+
+
+def iter_pypdf2_pages(pdf_reader, start=0, stop=None):
+    """
+    Percorre a árvore de páginas do PyPDF2 sob demanda, gerando pares (índice,
+    PageObject) de start até stop. Ao contrário de pdf_reader.pages, que lê a
+    árvore inteira no primeiro acesso, cada página é resolvida só quando é
+    pedida, e as subárvores anteriores a start são puladas pelo /Count.
+    """
+    from PyPDF2 import PageObject
+    from PyPDF2.generic import IndirectObject, NameObject
+
+    # Atributos que as páginas herdam dos nós intermediários
+    inheritable = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+    root = pdf_reader.trailer['/Root'].get_object()['/Pages']
+    stack = [(root, {})]  # (nó, atributos herdados); os filhos entram em ordem inversa
+    visited = set()
+    index = 0
+
+    while stack and (stop is None or index < stop):
+        reference, inherited = stack.pop()
+        if isinstance(reference, IndirectObject):
+            # Proteção contra árvores com ciclos
+            if reference.idnum in visited:
+                continue
+            visited.add(reference.idnum)
+        node = reference.get_object()
+
+        if node.get('/Type', '/Pages') == '/Pages':
+            count = node.get('/Count')
+            if isinstance(count, int) and index + count <= start:
+                index += count
+                continue
+            kids = node.get('/Kids', [])
+            if isinstance(count, int) and count == len(kids) and index < start:
+                # Todos os filhos são páginas: pular direto até start, sem ler cada uma
+                skipped = start - index
+                kids = kids[skipped:]
+                index += skipped
+            inherited = dict(inherited)
+            inherited.update((attr, node[attr]) for attr in inheritable if attr in node)
+            stack.extend((kid, inherited) for kid in reversed(kids))
+
+        elif node.get('/Type') == '/Page':
+            if index >= start:
+                page = PageObject(pdf_reader, reference if isinstance(reference, IndirectObject) else None)
+                page.update(node)
+                for attr, value in inherited.items():
+                    if attr not in page:
+                        page[NameObject(attr)] = value
+                yield index, page
+            index += 1
+
+
+def next_pypdf2_page(pypdf2_pages, page_index, log):
+    """
+    Próxima página de iter_pypdf2_pages, ou None se não houver conferência
+    ou se a árvore do PyPDF2 tiver menos páginas que o PyMuPDF
+    """
+    if pypdf2_pages is None:
+        return None
+    index, page = next(pypdf2_pages, (None, None))
+    if index != page_index:
+        log(f"Página {page_index+1}: não encontrada na árvore de páginas do PyPDF2", "WARNING")
+        return None
+    return page
+
+
+def analyze_page(pymupdf_doc, page_index, log=None, pypdf2_page=None, color_settings=None,
+                 paper_formats=None, renderer=None, classify_format=True):
+    """
+    Analisa boxes, formato e modo de cor de uma página e retorna um PageResult.
+    Se a página correspondente do PyPDF2 for informada, os boxes são conferidos com ela.
+    color_settings (ColorSettings) ajusta a detecção de cor e paper_formats
+    (PaperFormatRegistry) define os formatos de papel reconhecidos. A detecção
+    de cor e a cobertura de tinta renderizam a página a partir da mesma
+    display list, a do renderer (PageRenderer) se ele for informado. Com
+    classify_format=False o format_info fica vazio, para ser preenchido em
+    lote por describe_page_formats().
+    """
+    log = log or default_log
+    with instrumentacao.page(page_index):
+        renderer = renderer or PageRenderer(pymupdf_doc[page_index])
+        pymupdf_page = renderer.page
+        with instrumentacao.stage('boxes'):
+            page_info = pymupdf_page_boxes(pymupdf_page, page_index, log=log)
+
+            # Usar o tamanho da página como backup para o MediaBox
+            if not page_info.get('MediaBox'):
+                page_info['MediaBox'] = pymupdf_mediabox(pymupdf_page)
+                log(f"Usando o tamanho da página como MediaBox na página {page_index+1}", "INFO")
+
+        # Verificação cruzada opcional com o PyPDF2
+        if pypdf2_page is not None:
+            with instrumentacao.stage('verificacao_cruzada'):
+                pypdf2_info = analyze_page_boxes(pypdf2_page, page_index, log=log)
+                cross_check_boxes(page_info, pypdf2_info, page_index, log=log)
+
+        # Detectar modo de cor da página com PyMuPDF
+        color_mode, color_fraction = detect_color_mode(pymupdf_doc, page_index, log=log,
+                                                       settings=color_settings, renderer=renderer)
+
+        # Cobertura de tinta (opcional, custa uma renderização em CMYK)
+        ink_coverage = None
+        if color_settings is not None and color_settings.ink_coverage:
+            ink_coverage = measure_page_ink(pymupdf_page, page_index, color_settings, log, renderer)
+
+        # Determinar o formato (retrato, paisagem, etc.)
+        mediabox = page_info.get('MediaBox')
+        format_info = ""
+        if not mediabox:
+            log(f"Não foi possível determinar o formato da página {page_index+1}", "WARNING")
+        elif classify_format:
+            with instrumentacao.stage('formato'):
+                format_info = describe_format(mediabox, paper_formats)
+
+    return PageResult(page_index, page_info, color_mode, format_info, color_fraction, ink_coverage)
+
+
+def count_pages(pdf_path):
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def iter_page_results(pdf_path, start=0, stop=None, log=None, cross_check=False, session=None,
+                      color_settings=None, paper_formats=None):
+    """
+    Analisa as páginas [start, stop) em sequência, gerando um PageResult por página.
+    Com uma DocumentSession, o documento já aberto na sessão é reutilizado, assim
+    como a display list das páginas já renderizadas (ex.: pelas miniaturas).
+    """
+    log = log or default_log
+    pdf_reader = None
+    if cross_check:
+        import PyPDF2
+        pdf_reader = PyPDF2.PdfReader(pdf_path)
+
+    if session is None:
+        from sessao_documentos import DocumentSession
+        session = DocumentSession(max_documents=1, max_renderers=0)
+        owns_session = True
+    else:
+        owns_session = False
+
+    try:
+        if stop is None:
+            stop = session.page_count(pdf_path)
+        pypdf2_pages = iter_pypdf2_pages(pdf_reader, start, stop) if pdf_reader is not None else None
+        for i in range(start, stop):
+            pypdf2_page = next_pypdf2_page(pypdf2_pages, i, log)
+            # O lock da sessão é liberado entre as páginas para que outras
+            # threads (ex.: o preview) possam usar o documento
+            with session.document(pdf_path) as pymupdf_doc:
+                result = analyze_page(pymupdf_doc, i, log=log, pypdf2_page=pypdf2_page,
+                                      color_settings=color_settings, paper_formats=paper_formats,
+                                      renderer=session.page_renderer(pdf_path, i))
+            yield result
+    finally:
+        if owns_session:
+            session.close()
+
+
+def analyze_document(pdf_path, workers=1, cross_check=False, cache=None, color_settings=None,
+                     paper_formats=None):
+    """
+    Analisa todas as páginas do PDF e retorna um DocumentResult. Com mais de
+    um worker as páginas são distribuídas entre processos. Com um ResultCache
+    (aberto com os mesmos color_settings e paper_formats), arquivos já analisados são
+    carregados do cache.
+    Erros ao abrir ou ler o arquivo são registrados em DocumentResult.error.
+    """
+    result = DocumentResult(pdf_path)
+    try:
+        digest = None
+        if cache is not None:
+            digest = cache.file_hash(pdf_path)
+            cached = cache.load(digest)
+            if cached is not None:
+                result.num_pages = len(cached)
+                result.pages = cached
+                result.log("Resultado carregado do cache de análises", "INFO")
+                return result
+
+        result.num_pages = count_pages(pdf_path)
+        if workers == 1:
+            pages = iter_page_results(pdf_path, log=result.log, cross_check=cross_check,
+                                      color_settings=color_settings, paper_formats=paper_formats)
+        else:
+            from analise_paralela import ParallelAnalyzer
+            engine = ParallelAnalyzer(workers=workers, cross_check=cross_check,
+                                      color_settings=color_settings, paper_formats=paper_formats)
+            pages = engine.analyze(pdf_path, result.num_pages, log=result.log)
+        result.pages.extend(pages)
+
+        if cache is not None:
+            cache.store(digest, result.pages)
+    except Exception as e:
+        result.error = f"Erro ao analisar o PDF: {str(e)}"
+    return result
@@ -0,0 +1,134 @@
+"""
+Renderização de páginas em blocos, com memória limitada.
+
+Renderizada de uma vez, uma página de grande formato (plantas A0, banners de
+vários metros) ocupa centenas de MB. Aqui a área renderizada é dividida em
+blocos de no máximo TILE_PIXELS pixels, renderizados um de cada vez com clip a
+partir de uma display list, de modo que o conteúdo é interpretado uma única
+vez. Quem consome os blocos processa cada um e o descarta antes do próximo:
+o pico de memória depende do tamanho do bloco, e não do tamanho da página.
+
+    display_list = page.get_displaylist()
+    for x, y, pix in render_tiles(display_list, fitz.Matrix(2, 2)):
+        ...  # pix cobre os pixels a partir de (x, y) da página renderizada
+
+Um PageRenderer grava a display list de uma página na primeira renderização
+e a reaproveita nas seguintes, em qualquer escala: a detecção de cor, a
+cobertura de tinta, a miniatura e a visualização interpretam o conteúdo da
+página uma única vez.
+"""
+import math
+
+import instrumentacao
+
+# Pixels por bloco renderizado (3 bytes por pixel em RGB, 4 em CMYK)
+TILE_PIXELS = 1024 * 1024
+
+# Altura mínima de uma faixa; páginas mais largas são divididas também na horizontal
+MIN_STRIP_ROWS = 16
+
+# Pixels da visualização de uma página; páginas maiores são renderizadas em escala menor
+PREVIEW_MAX_PIXELS = 16 * 1024 * 1024
+
+
+def render_bbox(rect, matrix):
+    """Retângulo em pixels (IRect) da área rect (em pontos) renderizada com matrix"""
+    import fitz  # PyMuPDF
+
+    return (fitz.Rect(rect) * matrix).irect
+
+
+def iter_tiles(rect, matrix, max_pixels=TILE_PIXELS):
+    """
+    Divide a área rect (em pontos) renderizada com matrix em blocos de no
+    máximo max_pixels pixels e gera o clip de cada um, em pontos. Os blocos
+    são faixas com a largura inteira da área, a não ser que ela seja larga
+    demais para faixas de MIN_STRIP_ROWS linhas.
+    """
+    import fitz  # PyMuPDF
+
+    bbox = render_bbox(rect, matrix)
+    width, height = bbox.width, bbox.height
+    if width <= 0 or height <= 0:
+        return
+
+    max_pixels = max(1, int(max_pixels))
+    if width * MIN_STRIP_ROWS <= max_pixels:
+        tile_width, tile_height = width, max_pixels // width
+    else:
+        tile_width = tile_height = max(1, math.isqrt(max_pixels))
+
+    inverse = ~fitz.Matrix(matrix)
+    for y in range(bbox.y0, bbox.y1, tile_height):
+        for x in range(bbox.x0, bbox.x1, tile_width):
+            tile = fitz.Rect(x, y, min(x + tile_width, bbox.x1), min(y + tile_height, bbox.y1))
+            yield tile * inverse
+
+
+def render_tiles(display_list, matrix, clip=None, max_pixels=TILE_PIXELS, colorspace=None, alpha=False):
+    """
+    Renderiza a display list (ou só a região clip, em pontos) em blocos e gera
+    (x, y, pixmap), com a posição do bloco em pixels relativa ao canto da
+    área renderizada
+    """
+    import fitz  # PyMuPDF
+
+    rect = display_list.rect if clip is None else fitz.Rect(clip) & display_list.rect
+    bbox = render_bbox(rect, matrix)
+    colorspace = colorspace or fitz.csRGB
+    for tile in iter_tiles(rect, matrix, max_pixels):
+        with instrumentacao.stage('renderizacao'):
+            pix = display_list.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=alpha, clip=tile)
+        if pix.width and pix.height:
+            yield pix.x - bbox.x0, pix.y - bbox.y0, pix
+
+
+def pixmap_array(pix):
+    """
+    Array do NumPy (altura x largura x canais) sobre as amostras do pixmap,
+    sem cópia. Só é válido enquanto o pixmap existir.
+    """
+    import numpy as np
+
+    return np.ndarray((pix.height, pix.width, pix.n), dtype=np.uint8, buffer=pix.samples_mv,
+                      strides=(pix.stride, pix.n, 1))
+
+
+class PageRenderer:
+    """
+    Renderiza uma página do PyMuPDF em várias escalas a partir de uma única
+    display list, criada na primeira renderização. Como a página, só pode ser
+    usado enquanto o documento estiver aberto e por uma thread de cada vez.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.rect = page.rect
+        self._display_list = None
+
+    @property
+    def display_list(self):
+        if self._display_list is None:
+            with instrumentacao.stage('interpretacao'):
+                self._display_list = self.page.get_displaylist()
+        return self._display_list
+
+    def tiles(self, matrix, clip=None, max_pixels=TILE_PIXELS, colorspace=None, alpha=False):
+        """Blocos da página renderizada com matrix, como em render_tiles()"""
+        return render_tiles(self.display_list, matrix, clip, max_pixels, colorspace, alpha)
+
+    def pixmap(self, matrix, colorspace=None, alpha=False):
+        """Página inteira em um único pixmap, para renderizações pequenas (ex.: miniaturas)"""
+        import fitz  # PyMuPDF
+
+        display_list = self.display_list
+        with instrumentacao.stage('renderizacao'):
+            return display_list.get_pixmap(matrix=matrix, colorspace=colorspace or fitz.csRGB, alpha=alpha)
+
+
+def preview_zoom(rect, zoom, max_pixels=PREVIEW_MAX_PIXELS):
+    """Escala da visualização, reduzida para a página ter no máximo max_pixels pixels"""
+    area = rect.width * rect.height
+    if area <= 0:
+        return zoom
+    return min(zoom, math.sqrt(max_pixels / area))
@@ -0,0 +1,198 @@
+"""
+Armazenamento colunar dos resultados das páginas.
+
+Em vez de um dicionário de boxes por página, as coordenadas ficam em um array
+estruturado do NumPy e os textos repetidos (modo de cor, formato, origem do
+box) são guardados uma única vez e referenciados por códigos. Os PageResult e
+os dicionários de boxes são montados apenas para as páginas consultadas.
+"""
+import math
+
+import numpy as np
+
+from cobertura_tinta import InkCoverage
+from nucleo_analise import BOX_TYPES, PageResult, box_info
+
+PAGE_DTYPE = np.dtype([
+    ('page_index', np.int32),
+    ('boxes', np.float64, (len(BOX_TYPES), 4)),  # x1, y1, x2, y2 em pontos
+    ('box_source', np.uint8, (len(BOX_TYPES),)),  # 0 = box ausente, demais = origem + 1
+    ('color_mode', np.uint32),
+    ('color_fraction', np.float64),  # NaN quando não foi medida
+    # Cada tamanho "Personalizado" tem um código: acervos de digitalizações passam de 65.535
+    ('format_info', np.uint32),
+    ('ink', np.float64, (6,)),  # C, M, Y, K, TAC máximo e área acima do limite; NaN quando não medida
+])
+
+_NO_INK = (math.nan,) * 6
+
+# Capacidade inicial do array; ele dobra de tamanho quando enche
+INITIAL_CAPACITY = 1024
+
+
+class CodeTable:
+    """Associa cada valor distinto a um código inteiro, na ordem de chegada"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class PageResultStore:
+    """
+    Resultados das páginas em colunas. store[i] devolve o PageResult da
+    i-ésima página guardada; os métodos color_mode(i), format_info(i) etc.
+    leem um único campo sem montar o PageResult.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._rows = np.zeros(capacity, dtype=PAGE_DTYPE)
+        self._size = 0
+        self.color_modes = CodeTable()
+        self.formats = CodeTable()
+        self.sources = CodeTable()  # Origem dos boxes (None quando não informada)
+
+    def clear(self):
+        self._rows = np.zeros(INITIAL_CAPACITY, dtype=PAGE_DTYPE)
+        self._size = 0
+        self.color_modes = CodeTable()
+        self.formats = CodeTable()
+        self.sources = CodeTable()
+
+    @property
+    def rows(self):
+        """Array estruturado com as páginas guardadas (sem cópia)"""
+        return self._rows[:self._size]
+
+    @property
+    def nbytes(self):
+        return self._rows.nbytes
+
+    def _reserve(self, count):
+        if self._size + count <= len(self._rows):
+            return
+        capacity = max(len(self._rows) * 2, self._size + count)
+        rows = np.zeros(capacity, dtype=PAGE_DTYPE)
+        rows[:self._size] = self._rows[:self._size]
+        self._rows = rows
+
+    def append(self, page_result):
+        self.extend([page_result])
+
+    def extend(self, page_results):
+        page_results = list(page_results)
+        count = len(page_results)
+        self._reserve(count)
+
+        # Montar cada coluna em listas e copiar para o array de uma vez
+        coordinates = []
+        sources = []
+        for page_result in page_results:
+            boxes = page_result.boxes
+            for box_type in BOX_TYPES:
+                box = boxes.get(box_type)
+                if box is None:
+                    coordinates.extend((0.0, 0.0, 0.0, 0.0))
+                    sources.append(0)
+                else:
+                    coordinates.extend(box['raw'])
+                    sources.append(self.sources.code(box.get('source')) + 1)
+
+        block = self._rows[self._size:self._size + count]
+        block['page_index'] = [page_result.page_index for page_result in page_results]
+        block['boxes'] = np.array(coordinates, dtype=np.float64).reshape(count, len(BOX_TYPES), 4)
+        block['box_source'] = np.array(sources, dtype=np.uint8).reshape(count, len(BOX_TYPES))
+        block['color_mode'] = [self.color_modes.code(page_result.color_mode) for page_result in page_results]
+        block['color_fraction'] = [math.nan if page_result.color_fraction is None else page_result.color_fraction
+                                   for page_result in page_results]
+        block['format_info'] = [self.formats.code(page_result.format_info) for page_result in page_results]
+        block['ink'] = [page_result.ink_coverage.as_tuple() if page_result.ink_coverage else _NO_INK
+                        for page_result in page_results]
+        self._size += count
+
+    def __len__(self):
+        return self._size
+
+    def _row(self, i):
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        return self._rows[i]
+
+    def __getitem__(self, i):
+        row = self._row(i)
+        return PageResult(int(row['page_index']), self.boxes(i), self.color_modes[row['color_mode']],
+                          self.formats[row['format_info']], self.color_fraction(i), self.ink_coverage(i))
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def page_index(self, i):
+        return int(self._row(i)['page_index'])
+
+    def boxes(self, i):
+        """Dicionário de boxes da página, no mesmo formato de PageResult.boxes"""
+        row = self._row(i)
+        boxes = {}
+        for j, box_type in enumerate(BOX_TYPES):
+            source_code = row['box_source'][j]
+            if source_code:
+                x1, y1, x2, y2 = (float(value) for value in row['boxes'][j])
+                boxes[box_type] = box_info(x1, y1, x2, y2, self.sources[source_code - 1])
+        return boxes
+
+    def color_mode(self, i):
+        return self.color_modes[self._row(i)['color_mode']]
+
+    def color_fraction(self, i):
+        fraction = float(self._row(i)['color_fraction'])
+        return None if math.isnan(fraction) else fraction
+
+    def ink_coverage(self, i):
+        """InkCoverage da página, ou None quando a cobertura não foi medida"""
+        ink = self._row(i)['ink']
+        if math.isnan(ink[0]):
+            return None
+        return InkCoverage(*(float(value) for value in ink))
+
+    def format_info(self, i):
+        return self.formats[self._row(i)['format_info']]
+
+    def format_label(self, i):
+        return self.format_info(i) or "Desconhecido"
+
+    def mediabox_source(self, i):
+        source_code = self._row(i)['box_source'][0]
+        if not source_code:
+            return None
+        return self.sources[source_code - 1] or 'PyPDF2'
+
+    def distinct_formats(self):
+        """Formatos distintos das páginas guardadas, em ordem alfabética"""
+        codes = np.unique(self.rows['format_info'])
+        return sorted(set(self.formats[code] or "Desconhecido" for code in codes))
+
+    def color_counts(self):
+        """Quantidade de páginas por modo de cor"""
+        counts = np.bincount(self.rows['color_mode'], minlength=len(self.color_modes))
+        return {self.color_modes[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def mixed_formats(self):
+        return len(self.distinct_formats()) > 1
+
+    def mixed_colors(self):
+        counts = self.color_counts()
+        return counts.get("Colorido", 0) > 0 and counts.get("Preto e Branco", 0) > 0
@@ -0,0 +1,120 @@
+"""Sessão de documentos do PyMuPDF mantidos abertos entre análises e previews"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from renderizacao_blocos import PageRenderer
+
+# Quantidade padrão de documentos mantidos abertos ao mesmo tempo
+DEFAULT_MAX_DOCUMENTS = 4
+
+# Quantidade padrão de páginas com a display list mantida pela sessão
+DEFAULT_MAX_RENDERERS = 32
+
+
+class DocumentSession:
+    """
+    Mantém um fitz.Document aberto por arquivo, fechando os menos usados
+    recentemente quando o limite é atingido. O documento é reaberto se o
+    arquivo for alterado em disco.
+
+    O PyMuPDF não permite usar o mesmo documento em duas threads ao mesmo
+    tempo, por isso o acesso é feito com o lock da sessão:
+
+        with session.document(path) as doc:
+            pix = doc[0].get_pixmap()
+
+    A sessão também mantém um PageRenderer para as páginas usadas mais
+    recentemente, compartilhado pela análise, pelas miniaturas e pela
+    visualização: cada página é interpretada uma vez e renderizada em cada
+    escala a partir da mesma display list.
+
+        with session.document(path):
+            pix = session.page_renderer(path, 0).pixmap(fitz.Matrix(0.5, 0.5))
+    """
+
+    def __init__(self, max_documents=DEFAULT_MAX_DOCUMENTS, max_renderers=DEFAULT_MAX_RENDERERS):
+        self.max_documents = max(1, max_documents)
+        self.max_renderers = max(0, max_renderers)
+        self.lock = threading.RLock()
+        self._documents = OrderedDict()  # Caminho -> (identidade do arquivo, documento)
+        self._renderers = OrderedDict()  # (caminho, página) -> PageRenderer
+
+    @staticmethod
+    def file_identity(pdf_path):
+        """Identifica a versão do arquivo em disco (tamanho e data de modificação)"""
+        stat = os.stat(pdf_path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    @contextmanager
+    def document(self, pdf_path):
+        with self.lock:
+            yield self._get(pdf_path)
+
+    def page_renderer(self, pdf_path, page_index):
+        """
+        PageRenderer da página, reaproveitado entre as chamadas. Deve ser
+        usado dentro de document(), com o lock da sessão.
+        """
+        with self.lock:
+            doc = self._get(pdf_path)
+            key = (os.path.abspath(pdf_path), page_index)
+            renderer = self._renderers.get(key)
+            if renderer is not None:
+                self._renderers.move_to_end(key)
+                return renderer
+
+            renderer = PageRenderer(doc.load_page(page_index))
+            if self.max_renderers:
+                self._renderers[key] = renderer
+                while len(self._renderers) > self.max_renderers:
+                    self._renderers.popitem(last=False)
+            return renderer
+
+    def page_count(self, pdf_path):
+        with self.document(pdf_path) as doc:
+            return doc.page_count
+
+    def _get(self, pdf_path):
+        import fitz  # PyMuPDF
+
+        key = os.path.abspath(pdf_path)
+        identity = self.file_identity(key)
+
+        entry = self._documents.get(key)
+        if entry is not None:
+            if entry[0] == identity:
+                self._documents.move_to_end(key)
+                return entry[1]
+            # O arquivo mudou desde que foi aberto
+            self._close_key(key)
+
+        doc = fitz.open(key)
+        self._documents[key] = (identity, doc)
+
+        while len(self._documents) > self.max_documents:
+            self._close_key(next(iter(self._documents)))
+
+        return doc
+
+    def _close_key(self, key):
+        # As display lists dependem do documento aberto
+        for renderer_key in [renderer_key for renderer_key in self._renderers if renderer_key[0] == key]:
+            del self._renderers[renderer_key]
+        _, doc = self._documents.pop(key)
+        doc.close()
+
+    def close(self, pdf_path=None):
+        """Fecha o documento informado ou, sem argumento, todos os documentos"""
+        with self.lock:
+            if pdf_path is None:
+                for key in list(self._documents):
+                    self._close_key(key)
+            else:
+                key = os.path.abspath(pdf_path)
+                if key in self._documents:
+                    self._close_key(key)
+
+    def __len__(self):
+        return len(self._documents)
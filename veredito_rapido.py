@@ -0,0 +1,181 @@
+"""
+Veredito rápido: responde apenas se o documento mistura formatos de papel e
+se mistura páginas coloridas com preto e branco, parando assim que as duas
+respostas estão decididas.
+
+As verificações vão da mais barata para a mais cara: primeiro o formato de
+cada página (só o MediaBox), depois a inspeção do conteúdo vetorial e, por
+último, a renderização das páginas que continuaram indecisas.
+"""
+from dataclasses import dataclass, field
+
+from nucleo_analise import (ColorSettings, box_info, conclusive_color_mode, content_color_verdict,
+                            describe_format, has_mixed_colors, pymupdf_mediabox,
+                            rendered_color_mode)
+
+
+def _never_cancelled():
+    return False
+
+
+@dataclass
+class QuickVerdict:
+    """Resultado do veredito rápido de um documento"""
+    path: str
+    num_pages: int = 0
+    formats: dict = field(default_factory=dict)  # Formato -> primeira página (índice) encontrada
+    color_modes: dict = field(default_factory=dict)  # Modo de cor -> primeira página encontrada
+    pages_inspected: int = 0  # Páginas com o conteúdo inspecionado
+    pages_rendered: int = 0
+    from_cache: bool = False  # Veredito tirado de uma análise completa no cache
+    cancelled: bool = False
+    messages: list = field(default_factory=list)  # Pares (nível, mensagem)
+    error: str = None
+
+    def log(self, message, level="INFO"):
+        self.messages.append((level, message))
+
+    @property
+    def mixed_formats(self):
+        return len(self.formats) > 1
+
+    @property
+    def mixed_colors(self):
+        return has_mixed_colors(self.color_modes)
+
+    @classmethod
+    def from_page_results(cls, path, page_results):
+        """Veredito a partir dos resultados de uma análise completa"""
+        verdict = cls(path, len(page_results), from_cache=True)
+        for page_result in page_results:
+            verdict.formats.setdefault(page_result.format_label, page_result.page_index)
+            verdict.color_modes.setdefault(page_result.color_mode, page_result.page_index)
+        return verdict
+
+    def to_dict(self):
+        return {
+            'file': self.path,
+            'pages': self.num_pages,
+            'mixed_formats': self.mixed_formats,
+            'mixed_colors': self.mixed_colors,
+            'formats': {name: page + 1 for name, page in self.formats.items()},
+            'color_modes': {mode: page + 1 for mode, page in self.color_modes.items()},
+            'pages_inspected': self.pages_inspected,
+            'pages_rendered': self.pages_rendered,
+            'from_cache': self.from_cache,
+            'cancelled': self.cancelled,
+            'log': [{'level': level, 'message': message} for level, message in self.messages],
+            'error': self.error
+        }
+
+
+def _check_formats(session, verdict, paper_formats, cancelled):
+    """Lê o MediaBox das páginas até encontrar dois formatos diferentes"""
+    formats = {}  # (largura, altura) -> formato, para classificar cada tamanho uma vez
+    for page_index in range(verdict.num_pages):
+        if cancelled():
+            verdict.cancelled = True
+            return
+        with session.document(verdict.path) as pdf_document:
+            page = pdf_document[page_index]
+            try:
+                rect = page.mediabox
+                mediabox = box_info(rect.x0, rect.y0, rect.x1, rect.y1)
+            except Exception:
+                mediabox = pymupdf_mediabox(page)
+
+        size = (mediabox['width'], mediabox['height'])
+        format_info = formats.get(size)
+        if format_info is None:
+            format_info = formats[size] = describe_format(mediabox, paper_formats)
+        verdict.formats.setdefault(format_info, page_index)
+        if verdict.mixed_formats:
+            return
+
+
+def _check_colors(session, verdict, settings, log, cancelled):
+    """
+    Procura uma página colorida e uma preto e branco: primeiro pelo conteúdo
+    de todas as páginas e só então renderizando as que ficaram indecisas
+    """
+    likely_color = []  # Conteúdo colorido, mas a área mínima exige renderizar
+    undecided = []
+    for page_index in range(verdict.num_pages):
+        if verdict.mixed_colors:
+            return
+        if cancelled():
+            verdict.cancelled = True
+            return
+        with session.document(verdict.path) as pdf_document:
+            content_verdict = content_color_verdict(pdf_document, pdf_document[page_index], settings)
+        verdict.pages_inspected += 1
+        result = conclusive_color_mode(content_verdict, settings)
+        if result is not None:
+            verdict.color_modes.setdefault(result[0], page_index)
+        elif content_verdict == "Colorido":
+            likely_color.append(page_index)
+        else:
+            undecided.append(page_index)
+
+    # Faltando uma página colorida, começar pelas que o conteúdo indica cor
+    if "Colorido" not in verdict.color_modes:
+        candidates = likely_color + undecided
+    else:
+        candidates = undecided + likely_color
+
+    for page_index in candidates:
+        if verdict.mixed_colors:
+            return
+        if cancelled():
+            verdict.cancelled = True
+            return
+        try:
+            with session.document(verdict.path):
+                renderer = session.page_renderer(verdict.path, page_index)
+                color_mode, _ = rendered_color_mode(renderer.page, settings, renderer)
+        except Exception as e:
+            log(f"Erro ao detectar cor na página {page_index+1}: {str(e)}", "WARNING")
+            continue
+        verdict.pages_rendered += 1
+        verdict.color_modes.setdefault(color_mode, page_index)
+
+
+def quick_verdict(pdf_path, color_settings=None, paper_formats=None, cache=None, log=None,
+                  cancelled=None, session=None):
+    """
+    Decide se o PDF mistura formatos e modos de cor sem analisar todas as
+    páginas por completo e retorna um QuickVerdict. Com um ResultCache, uma
+    análise completa já guardada responde sem abrir o documento. cancelled
+    é uma função consultada entre as páginas para interromper a verificação.
+    Com uma DocumentSession, o documento e as display lists da sessão são
+    usados com o lock dela, liberado entre as páginas, como em
+    iter_page_results().
+    """
+    verdict = QuickVerdict(pdf_path)
+    log = log or verdict.log
+    cancelled = cancelled or _never_cancelled
+    settings = color_settings or ColorSettings()
+
+    if session is None:
+        from sessao_documentos import DocumentSession
+        session = DocumentSession(max_documents=1, max_renderers=0)
+        owns_session = True
+    else:
+        owns_session = False
+
+    try:
+        if cache is not None:
+            cached = cache.load(cache.file_hash(pdf_path))
+            if cached is not None:
+                return QuickVerdict.from_page_results(pdf_path, cached)
+
+        verdict.num_pages = session.page_count(pdf_path)
+        _check_formats(session, verdict, paper_formats, cancelled)
+        if not verdict.cancelled:
+            _check_colors(session, verdict, settings, log, cancelled)
+    except Exception as e:
+        verdict.error = f"Erro ao analisar o PDF: {str(e)}"
+    finally:
+        if owns_session:
+            session.close()
+    return verdict